@@ -43,6 +43,9 @@ if "CIBUILDWHEEL" in os.environ and os.environ["CIBUILDWHEEL"] == "1":
 setuptools.setup(
     # The resulting "mymath" archive contains two packages: mymath_swig and mymath_pybind.
     # This approach separates the two bindings types, typically just one of them is used.
+    # Since the two extensions configure the same project with the same CMake options,
+    # except the switches listed in cmake_variant_variables, they share the build folder
+    # and the common mymath library is compiled only once.
     ext_modules=[
         cmake_build_extension.CMakeExtension(
             # This could be anything you like, it is used to create build folders
@@ -68,6 +71,8 @@ setuptools.setup(
                 "-DEXAMPLE_WITH_PYBIND11:BOOL=OFF",
             ]
             + CIBW_CMAKE_OPTIONS,
+            # The values of the bindings switches can differ in the shared build folder
+            cmake_variant_variables=["EXAMPLE_WITH_*"],
         ),
         cmake_build_extension.CMakeExtension(
             name="Pybind11Bindings",
@@ -99,6 +104,8 @@ setuptools.setup(
                 "-DEXAMPLE_WITH_PYBIND11:BOOL=ON",
             ]
             + CIBW_CMAKE_OPTIONS,
+            # The values of the bindings switches can differ in the shared build folder
+            cmake_variant_variables=["EXAMPLE_WITH_*"],
         ),
     ],
     cmdclass=dict(
@@ -2,9 +2,15 @@ import os
 from contextlib import contextmanager
 from pathlib import Path
 
-from . import build_ext_option, sdist_command
+from . import build_ext_option, build_folders, sdist_command
 from .build_extension import BuildExtension
+from .builder import BuildEvent, CMakeBuilder
 from .cmake_extension import CMakeExtension
+from .distributed_compile import DistributedCompile
+from .fetchcontent_cache import FetchContentCache
+from .gc_command import BuildFoldersGC
+from .import_profiler import ImportBudget, ImportProfile
+from .prefetch_command import FetchContentPrefetch
 from .sdist_command import GitSdistFolder, GitSdistTree
 
 
@@ -1,14 +1,26 @@
-import importlib.util
+import asyncio
+import fnmatch
 import os
-import platform
 import shutil
-import subprocess
 from pathlib import Path
+from typing import Dict, List, Tuple
 
 from setuptools.command.build_ext import build_ext
 
 from .build_ext_option import BuildExtOption, add_new_build_ext_option
+from .build_folders import BuildFolderIndex
+from .builder import CMakeBuilder
 from .cmake_extension import CMakeExtension
+from .fetchcontent_cache import FETCHCONTENT_CACHE_ENV, FetchContentCache
+
+# CMake cache variables whose values are always part of the signature of the build
+# folder, also if they match the cmake_variant_variables of the extension
+BUILD_SIGNATURE_VARIABLES = (
+    "CMAKE_TOOLCHAIN_FILE",
+    "CMAKE_*_COMPILER*",
+    "CMAKE_*_FLAGS*",
+    "CMAKE_GENERATOR_*",
+)
 
 # These options are listed in `python setup.py build_ext -h`
 custom_options = [
@@ -20,13 +32,19 @@ custom_options = [
     BuildExtOption(
         variable="component",
         short="C",
-        help="Install only a specific CMake component (example: '-Cbindings')",
+        help="Install only specific CMake components (examples: '-Cbindings', "
+        "'-Cbindings;runtime')",
     ),
     BuildExtOption(
         variable="no-cmake-extension",
         short="K",
         help="Disable a CMakeExtension module (examples: '-Kall', '-Kbar', '-Kbar;foo')",
     ),
+    BuildExtOption(
+        variable="fetchcontent-cache",
+        short="F",
+        help="Shared cache of the FetchContent sources (example: '-F/var/cache/deps')",
+    ),
 ]
 
 for o in custom_options:
@@ -57,12 +75,22 @@ class BuildExtension(build_ext):
         # It allows disabling one or more CMakeExtension from the command line.
         self.no_cmake_extension = None
 
+        # Extensions sharing the build folder, populated when the command runs
+        self.shared_build_folders = {}
+
+        # Initialize the 'fetchcontent-cache' custom option.
+        # It enables the cache of the dependency sources populated by FetchContent.
+        self.fetchcontent_cache = None
+
     def finalize_options(self):
 
         # Parse the custom CMake options and store them in a new attribute
         defines = [] if self.define is None else self.define.split(";")
         self.cmake_defines = [f"-D{define}" for define in defines]
 
+        # Parse the CMake components to install and store them in a new attribute
+        self.components = None if self.component is None else self.component.split(";")
+
         # Parse the disabled CMakeExtension modules and store them in a new attribute
         self.no_cmake_extensions = (
             []
@@ -70,6 +98,10 @@ class BuildExtension(build_ext):
             else self.no_cmake_extension.split(";")
         )
 
+        # The FetchContent cache can also be enabled with an environment variable
+        if self.fetchcontent_cache is None:
+            self.fetchcontent_cache = os.environ.get(FETCHCONTENT_CACHE_ENV) or None
+
         # Call base class
         build_ext.finalize_options(self)
 
@@ -88,6 +120,8 @@ class BuildExtension(build_ext):
         if shutil.which("cmake") is None:
             raise RuntimeError("Required command 'cmake' not found")
 
+        enabled_extensions = []
+
         for ext in cmake_extensions:
             # Check that Ninja is installed
             if (ext.cmake_generator and 
@@ -111,6 +145,12 @@ class BuildExtension(build_ext):
             ):
                 continue
 
+            enabled_extensions.append(ext)
+
+        # Extensions with compatible configurations share the same build folder
+        self.shared_build_folders = self.group_build_folders(enabled_extensions)
+
+        for ext in enabled_extensions:
             self.build_extension(ext)
 
     def build_extension(self, ext: CMakeExtension) -> None:
@@ -125,16 +165,28 @@ class BuildExtension(build_ext):
             print(f"Editable install recognized. Extension '{ext.name}' disabled.")
             return
 
-        # Export CMAKE_PREFIX_PATH of all the dependencies
-        for pkg in ext.cmake_depends_on:
+        builder = self.cmake_builder(ext=ext)
+
+        if self.inplace and ext.editable_symlinks:
+            print(
+                f"Editable install recognized. Extension '{ext.name}' is installed "
+                f"with symlinks to '{builder.build_folder}', rebuild it with "
+                f"'cmake --build {builder.build_folder}'."
+            )
+
+        # Configure, build, and install the CMake project
+        asyncio.run(builder.run())
+
+    def cmake_builder(self, ext: CMakeExtension) -> CMakeBuilder:
+        """
+        Create the builder of a CMakeExtension object.
 
-            try:
-                importlib.import_module(pkg)
-            except ImportError:
-                raise ValueError(f"Failed to import '{pkg}'")
+        Args:
+            ext: The CMakeExtension object to build.
 
-            init = importlib.util.find_spec(pkg).origin
-            BuildExtension.extend_cmake_prefix_path(path=str(Path(init).parent))
+        Returns:
+            The builder configured with the folders and options of this command.
+        """
 
         # The ext_dir directory can be thought as a temporary site-package folder.
         #
@@ -145,157 +197,137 @@ class BuildExtension(build_ext):
         #   ext_dir is the in-source folder containing the Python packages. In this case,
         #   the CMake project is installed in-source.
         ext_dir = Path(self.get_ext_fullpath(ext.name)).parent.absolute()
-        cmake_install_prefix = ext_dir / ext.install_prefix
 
-        # Initialize the CMake configuration arguments
-        configure_args = []
+        # Get the name of the build folder, that could be shared with other extensions
+        folder_name, folder_extensions = self.shared_build_folders.get(
+            ext.name, (ext.name, [ext.name])
+        )
+
+        # Get the absolute path to the build folder
+        build_folder = str(Path(".").absolute() / f"{self.build_temp}_{folder_name}")
+
+        # Track the build folder so that it can be garbage collected by BuildFoldersGC
+        BuildFolderIndex.from_build_temp(build_temp=self.build_temp).register(
+            path=build_folder,
+            extensions=folder_extensions,
+            source_dir=ext.source_dir,
+            cmake_build_type=ext.cmake_build_type,
+        )
+
+        # Parse the optional CMake options. They can be passed as:
+        #
+        # python setup.py build_ext -D"BAR=Foo;VAR=TRUE"
+        # python setup.py bdist_wheel build_ext -D"BAR=Foo;VAR=TRUE"
+        # python setup.py install build_ext -D"BAR=Foo;VAR=TRUE"
+        # python setup.py install -e build_ext -D"BAR=Foo;VAR=TRUE"
+        # pip install --global-option="build_ext" --global-option="-DBAR=Foo;VAR=TRUE" .
+        #
+        # If the `--component` command line option is used, install just the specified
+        # components. This has higher priority than what specified in the CMakeExtension.
+        #
+        # The extensions sharing the build folder share also its CMake cache, therefore
+        # all of them find the CMake dependencies of any of them.
+        return CMakeBuilder(
+            ext=ext,
+            build_folder=build_folder,
+            ext_dir=str(ext_dir),
+            cmake_defines=self.cmake_defines,
+            cmake_component=self.components,
+            symlink_install=self.inplace and ext.editable_symlinks,
+            fetchcontent_cache=(
+                None
+                if self.fetchcontent_cache is None
+                else FetchContentCache(cache_dir=self.fetchcontent_cache)
+            ),
+            cmake_depends_on=[
+                pkg
+                for e in self.extensions
+                if e.name in folder_extensions and e is not ext
+                for pkg in e.cmake_depends_on
+            ],
+        )
+
+    def group_build_folders(
+        self, extensions: List[CMakeExtension]
+    ) -> Dict[str, Tuple[str, List[str]]]:
+        """
+        Group the extensions that can share the same build folder.
+
+        Extensions are compatible if they configure the same source_dir with the same
+        generator, build type, and configure options, except the values of their
+        cmake_variant_variables. The values of the toolchain, compilers, flags, and
+        generator variables must always be equal. Compatible extensions are built
+        sequentially in the build folder of the first of them. Each of them
+        configures the shared folder incrementally with its own options and install
+        prefix, therefore the objects not affected by the different options are
+        compiled only once. The CMAKE_PREFIX_PATH of each of them includes the
+        cmake_depends_on packages of all of them.
 
-        # Select the appropriate generator and accompanying settings
-        if ext.cmake_generator is not None:
-            configure_args += ["-G", ext.cmake_generator]
+        Args:
+            extensions: The enabled CMakeExtension objects.
 
-            if ext.cmake_generator == "Ninja":
-                # Fix #26: https://github.com/diegoferigo/cmake-build-extension/issues/26
-                configure_args += [f"-DCMAKE_MAKE_PROGRAM={shutil.which('ninja')}"]
+        Returns:
+            A dictionary mapping the name of each extension to the name of its build
+            folder and the names of all the extensions sharing it.
+        """
 
-        # CMake configure arguments
-        configure_args += [
-            f"-DCMAKE_BUILD_TYPE={ext.cmake_build_type}",
-            f"-DCMAKE_INSTALL_PREFIX:PATH={cmake_install_prefix}",
-        ]
+        groups = {}
 
-        # Extend the configure arguments with those passed from the extension
-        configure_args += ext.cmake_configure_options
+        for ext in extensions:
 
-        # CMake build arguments
-        build_args = ["--config", ext.cmake_build_type]
+            # Symlinks installed in editable mode must keep pointing to their outputs
+            if self.inplace and ext.editable_symlinks:
+                signature = ext.name
+            else:
+                signature = BuildExtension.build_signature(ext=ext)
 
-        # CMake install arguments
-        install_args = ["--config", ext.cmake_build_type]
+            groups.setdefault(signature, []).append(ext.name)
 
-        if platform.system() == "Windows":
+        return {name: (names[0], names) for names in groups.values() for name in names}
 
-            configure_args += []
+    @staticmethod
+    def build_signature(ext: CMakeExtension) -> Tuple:
+        """
+        Compute the signature of the build folder of an extension.
 
-        elif platform.system() in {"Linux", "Darwin", "GNU"}:
+        Args:
+            ext: The CMakeExtension object.
 
-            configure_args += []
+        Returns:
+            A hashable signature that is equal for extensions that can share the
+            build folder.
+        """
 
-        else:
-            raise RuntimeError(f"Unsupported '{platform.system()}' platform")
+        def matches(name: str, patterns: List[str]) -> bool:
+            return any(fnmatch.fnmatchcase(name, p) for p in patterns)
 
-        # Parse the optional CMake options. They can be passed as:
-        #
-        # python setup.py build_ext -D"BAR=Foo;VAR=TRUE"
-        # python setup.py bdist_wheel build_ext -D"BAR=Foo;VAR=TRUE"
-        # python setup.py install build_ext -D"BAR=Foo;VAR=TRUE"
-        # python setup.py install -e build_ext -D"BAR=Foo;VAR=TRUE"
-        # pip install --global-option="build_ext" --global-option="-DBAR=Foo;VAR=TRUE" .
-        #
-        configure_args += self.cmake_defines
+        options = []
 
-        # Get the absolute path to the build folder
-        build_folder = str(Path(".").absolute() / f"{self.build_temp}_{ext.name}")
+        for option in ext.cmake_configure_options:
 
-        # Make sure that the build folder exists
-        Path(build_folder).mkdir(exist_ok=True, parents=True)
+            if option.startswith("-D"):
+                name, _, value = option[2:].partition("=")
+                name = name.partition(":")[0]
 
-        # 1. Compose CMake configure command
-        configure_command = [
-            "cmake",
-            "-S",
-            ext.source_dir,
-            "-B",
-            build_folder,
-        ] + configure_args
-
-        # 2. Compose CMake build command
-        build_command = ["cmake", "--build", build_folder] + build_args
-
-        # 3. Compose CMake install command
-        install_command = ["cmake", "--install", build_folder] + install_args
-
-        # If the cmake_component option of the CMakeExtension is used, install just
-        # the specified component.
-        if self.component is None and ext.cmake_component is not None:
-            install_command.extend(["--component", ext.cmake_component])
-
-        # Instead, if the `--component` command line option is used, install just
-        # the specified component. This has higher priority than what specified in
-        # the CMakeExtension.
-        if self.component is not None:
-            install_command.extend(["--component", self.component])
-
-        print("")
-        print("==> Configuring:")
-        print(f"$ {' '.join(configure_command)}")
-        print("")
-        print("==> Building:")
-        print(f"$ {' '.join(build_command)}")
-        print("")
-        print("==> Installing:")
-        print(f"$ {' '.join(install_command)}")
-        print("")
-
-        # Call CMake
-        subprocess.check_call(configure_command)
-        subprocess.check_call(build_command)
-        subprocess.check_call(install_command)
-
-        # Write content to the top-level __init__.py
-        if ext.write_top_level_init is not None:
-            with open(file=cmake_install_prefix / "__init__.py", mode="w") as f:
-                f.write(ext.write_top_level_init)
-
-        # Write content to the bin/__main__.py magic file to expose binaries
-        if len(ext.expose_binaries) > 0:
-            bin_dirs = {str(Path(d).parents[0]) for d in ext.expose_binaries}
-
-            import inspect
-
-            main_py = inspect.cleandoc(
-                f"""
-                from pathlib import Path
-                import subprocess
-                import sys
-
-                def main():
-
-                    binary_name = Path(sys.argv[0]).name
-                    prefix = Path(__file__).parent.parent
-                    bin_dirs = {str(bin_dirs)}
-
-                    binary_path = ""
-
-                    for dir in bin_dirs:
-                        path = prefix / Path(dir) / binary_name
-                        if path.is_file():
-                            binary_path = str(path)
-                            break
-
-                        path = Path(str(path) + ".exe")
-                        if path.is_file():
-                            binary_path = str(path)
-                            break
-
-                    if not Path(binary_path).is_file():
-                        name = binary_path if binary_path != "" else binary_name
-                        raise RuntimeError(f"Failed to find binary: {{ name }}")
-
-                    sys.argv[0] = binary_path
-
-                    result = subprocess.run(args=sys.argv, capture_output=False)
-                    exit(result.returncode)
-
-                if __name__ == "__main__" and len(sys.argv) > 1:
-                    sys.argv = sys.argv[1:]
-                    main()"""
-            )
+                # Only the names of the variant variables are part of the signature
+                if matches(name, ext.cmake_variant_variables) and not matches(
+                    name, BUILD_SIGNATURE_VARIABLES
+                ):
+                    option = f"-D{name}"
+                else:
+                    option = f"-D{name}={value}"
 
-            bin_folder = cmake_install_prefix / "bin"
-            Path(bin_folder).mkdir(exist_ok=True, parents=True)
-            with open(file=bin_folder / "__main__.py", mode="w") as f:
-                f.write(main_py)
+            options.append(option)
+
+        return (
+            ext.source_dir,
+            ext.cmake_generator,
+            ext.cmake_build_type,
+            repr(ext.distributed_compile),
+            ext.normalize_paths,
+            tuple(sorted(ext.cmake_variant_variables)),
+            tuple(sorted(options)),
+        )
 
     @staticmethod
     def extend_cmake_prefix_path(path: str) -> None:
@@ -0,0 +1,285 @@
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from .file_lock import file_lock
+
+# Name of the index file stored next to the build folders
+INDEX_FILE_NAME = "cmake_build_extension_index.json"
+
+# Suffixes of the intermediate object files that can be pruned from a build folder
+OBJECT_FILE_SUFFIXES = {".o", ".obj"}
+
+
+class BuildFolder(NamedTuple):
+    """
+    NamedTuple that stores the metadata of a build folder created by BuildExtension.
+
+    Args:
+        path: The absolute path of the build folder.
+        extensions: The names of the CMakeExtension objects built in the folder.
+        source_dir: The location of the main CMakeLists.txt.
+        cmake_build_type: The build type of the CMake project.
+        created: The creation time of the entry (seconds since the epoch).
+        last_used: The time the folder was last used (seconds since the epoch).
+    """
+
+    path: str
+    extensions: List[str]
+    source_dir: str
+    cmake_build_type: str
+    created: float
+    last_used: float
+
+
+class BuildFolderIndex:
+    """
+    Small JSON index that tracks the build folders created by BuildExtension.
+
+    The index is stored in the parent of the build_temp folder, that is shared by all
+    the '{build_temp}_{name}' folders created by the same project. The updates of the
+    index are serialized with a lock file, so that concurrent builds do not lose their
+    entries.
+
+    Args:
+        index_file: The path to the JSON index file.
+    """
+
+    def __init__(self, index_file: Path):
+
+        self.index_file = Path(index_file).absolute()
+        self.lock_file = self.index_file.with_suffix(".lock")
+
+    @staticmethod
+    def from_build_temp(build_temp: str) -> "BuildFolderIndex":
+        """
+        Create the index associated to a build_temp folder.
+
+        Args:
+            build_temp: The build_temp folder of the build_ext command.
+
+        Returns:
+            The index tracking the build folders created from build_temp.
+        """
+
+        index_dir = Path(build_temp).absolute().parent
+        return BuildFolderIndex(index_file=index_dir / INDEX_FILE_NAME)
+
+    def load(self) -> Dict[str, BuildFolder]:
+        """
+        Load all the entries of the index.
+
+        Returns:
+            A dictionary mapping the build folder path to its metadata.
+        """
+
+        if not self.index_file.is_file():
+            return {}
+
+        try:
+            with open(file=self.index_file, mode="r") as f:
+                content = json.load(f)
+        except (OSError, ValueError):
+            print(f"Ignoring corrupted build folder index '{self.index_file}'")
+            return {}
+
+        return {path: BuildFolder(**entry) for path, entry in content.items()}
+
+    def save(self, entries: Dict[str, BuildFolder]) -> None:
+        """
+        Store the entries in the index, replacing its content.
+
+        Args:
+            entries: A dictionary mapping the build folder path to its metadata.
+        """
+
+        self.index_file.parent.mkdir(exist_ok=True, parents=True)
+
+        # Write to a temporary file and replace the index atomically
+        tmp_file = self.index_file.with_suffix(f".{os.getpid()}.tmp")
+
+        with open(file=tmp_file, mode="w") as f:
+            json.dump({p: e._asdict() for p, e in entries.items()}, f, indent=2)
+
+        os.replace(tmp_file, self.index_file)
+
+    def register(
+        self,
+        path: str,
+        extensions: Iterable[str],
+        source_dir: str,
+        cmake_build_type: str,
+    ) -> BuildFolder:
+        """
+        Register a build folder in the index, or refresh its last use time.
+
+        Args:
+            path: The path of the build folder.
+            extensions: The names of the CMakeExtension objects built in the folder.
+            source_dir: The location of the main CMakeLists.txt.
+            cmake_build_type: The build type of the CMake project.
+
+        Returns:
+            The updated entry of the build folder.
+        """
+
+        path = str(Path(path).absolute())
+
+        with file_lock(path=self.lock_file):
+
+            entries = self.load()
+            now = time.time()
+
+            created = entries[path].created if path in entries else now
+
+            entries[path] = BuildFolder(
+                path=path,
+                extensions=sorted(extensions),
+                source_dir=source_dir,
+                cmake_build_type=cmake_build_type,
+                created=created,
+                last_used=now,
+            )
+
+            self.save(entries=entries)
+
+        return entries[path]
+
+    def entries(self) -> List[BuildFolder]:
+        """
+        Return the entries of the index whose build folder still exists.
+
+        Entries of the folders removed externally are dropped from the index.
+
+        Returns:
+            The list of tracked build folders, sorted from the least recently used.
+        """
+
+        with file_lock(path=self.lock_file):
+
+            entries = self.load()
+            existing = {p: e for p, e in entries.items() if Path(p).is_dir()}
+
+            if len(existing) != len(entries):
+                self.save(entries=existing)
+
+        return sorted(existing.values(), key=lambda e: e.last_used)
+
+    def evict(self, folder: BuildFolder) -> None:
+        """
+        Delete a build folder and remove it from the index.
+
+        Args:
+            folder: The build folder to evict.
+        """
+
+        shutil.rmtree(folder.path, ignore_errors=True)
+
+        with file_lock(path=self.lock_file):
+
+            entries = self.load()
+            entries.pop(folder.path, None)
+            self.save(entries=entries)
+
+
+def folder_size(path: str) -> int:
+    """
+    Compute the disk usage of a folder.
+
+    Args:
+        path: The path of the folder.
+
+    Returns:
+        The total size in bytes of the files contained in the folder.
+    """
+
+    size = 0
+
+    for root, _, files in os.walk(path):
+        for name in files:
+            file = Path(root) / name
+            if not file.is_symlink():
+                size += file.stat().st_size
+
+    return size
+
+
+def select_evictions(
+    folders: List[BuildFolder],
+    max_age: Optional[float] = None,
+    max_size: Optional[int] = None,
+    known_extensions: Optional[Iterable[str]] = None,
+) -> List[BuildFolder]:
+    """
+    Select the build folders to evict.
+
+    Args:
+        folders: The tracked build folders.
+        max_age: Evict the folders not used for more than the given seconds.
+        max_size: Evict the least recently used folders until the total size in bytes
+            of the remaining folders fits in the given budget.
+        known_extensions: If passed, evict the folders whose extensions are not part
+            of the given names (orphaned folders).
+
+    Returns:
+        The list of build folders to evict.
+    """
+
+    now = time.time()
+    evicted = []
+    kept = []
+
+    for folder in sorted(folders, key=lambda e: e.last_used):
+
+        orphaned = known_extensions is not None and not set(folder.extensions) & set(
+            known_extensions
+        )
+
+        expired = max_age is not None and now - folder.last_used > max_age
+
+        if orphaned or expired:
+            evicted.append(folder)
+        else:
+            kept.append(folder)
+
+    if max_size is not None:
+
+        sizes = {f.path: folder_size(f.path) for f in kept}
+        total_size = sum(sizes.values())
+
+        # Kept folders are sorted from the least recently used
+        while len(kept) > 0 and total_size > max_size:
+            folder = kept.pop(0)
+            total_size -= sizes[folder.path]
+            evicted.append(folder)
+
+    return evicted
+
+
+def prune_object_files(path: str) -> int:
+    """
+    Delete the intermediate object files of a build folder.
+
+    The CMake cache and the generated build system are kept, therefore the folder can
+    still be used for incremental builds without configuring the project again.
+
+    Args:
+        path: The path of the build folder.
+
+    Returns:
+        The number of bytes freed.
+    """
+
+    freed = 0
+
+    for root, _, files in os.walk(path):
+        for name in files:
+            file = Path(root) / name
+            if file.suffix in OBJECT_FILE_SUFFIXES and not file.is_symlink():
+                freed += file.stat().st_size
+                file.unlink()
+
+    return freed
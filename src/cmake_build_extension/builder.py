@@ -0,0 +1,777 @@
+import asyncio
+import importlib.util
+import inspect
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+from .cmake_extension import CMakeExtension
+from .fetchcontent_cache import FETCHCONTENT_PROVIDER_SCRIPT, FetchContentCache
+from .import_profiler import check_budget, profile_import
+from .path_normalization import (
+    NORMALIZED_BUILD_DIR,
+    NORMALIZED_SOURCE_DIR,
+    find_absolute_paths,
+    prefix_map_script,
+)
+
+# Name of the file in the build folder storing the files of the last installation.
+# Build folders can be shared by multiple extensions, therefore it includes their name.
+INSTALLED_FILES_MANIFEST = "cmake_build_extension_manifest_{name}.txt"
+
+# Name of the CMake script in the build folder normalizing the absolute paths
+PREFIX_MAP_SCRIPT = "cmake_build_extension_prefix_map.cmake"
+
+# Name of the JSON report in the build folder storing the import profile
+IMPORT_PROFILE_REPORT = "cmake_build_extension_import_profile_{name}.json"
+
+# Size of the chunks read from the output of the CMake processes
+OUTPUT_CHUNK_SIZE = 64 * 1024
+
+
+class BuildEvent(NamedTuple):
+    """
+    NamedTuple that stores a progress event emitted by CMakeBuilder.
+
+    Args:
+        extension: The name of the CMakeExtension being built.
+        phase: The phase of the pipeline ('configure', 'build', 'install', 'finalize',
+            'profile').
+        kind: The kind of event ('started', 'output', 'finished', 'failed',
+            'cancelled').
+        message: The command that started, or the line of output.
+    """
+
+    extension: str
+    phase: str
+    kind: str
+    message: str = ""
+
+
+def print_event(event: BuildEvent) -> None:
+    """
+    Default event handler, printing the commands and their output to stdout.
+
+    Args:
+        event: The progress event.
+    """
+
+    titles = dict(configure="Configuring", build="Building", install="Installing")
+
+    if event.kind == "started" and event.phase in titles:
+        print("")
+        print(f"==> {titles[event.phase]}:")
+        print(f"$ {event.message}")
+        print("")
+
+    elif event.kind == "output":
+        print(event.message, flush=True)
+
+
+class CMakeBuilder:
+    """
+    Standalone builder of a CMakeExtension, independent of setuptools.
+
+    Each phase of the configure/build/install pipeline is exposed as an asyncio
+    coroutine, so that a single process can drive many builds concurrently. Cancelling
+    a coroutine terminates the running CMake process.
+
+    Args:
+        ext: The CMakeExtension object to build.
+        build_folder: The CMake build folder.
+        ext_dir: The folder that can be thought as a temporary site-package folder.
+            The CMake project is installed in its 'ext.install_prefix' subfolder.
+        cmake_defines: Additional CMake configure options (-DBAR=FOO).
+        cmake_component: The name of the component to install, or a list of names.
+            If passed, it has higher priority than the cmake_component option of the
+            extension.
+        fetchcontent_cache: The optional cache of the FetchContent sources.
+        cmake_depends_on: Additional dependency packages containing required CMake
+            projects, besides the cmake_depends_on option of the extension (e.g. the
+            dependencies of the other extensions sharing the build folder).
+        symlink_install: Install symlinks to the outputs of the build tree instead of
+            copies (requires CMake >= 3.22).
+        env: The environment of the CMake processes. Defaults to os.environ.
+        on_event: The callback receiving the progress events.
+
+    Example:
+
+        builder = CMakeBuilder(ext=ext, build_folder="build", ext_dir="dist")
+        await builder.run()
+    """
+
+    def __init__(
+        self,
+        ext: CMakeExtension,
+        build_folder: str,
+        ext_dir: str,
+        cmake_defines: List[str] = (),
+        cmake_component: Optional[Union[str, List[str]]] = None,
+        symlink_install: bool = False,
+        fetchcontent_cache: Optional[FetchContentCache] = None,
+        cmake_depends_on: List[str] = (),
+        env: Optional[Dict[str, str]] = None,
+        on_event: Callable[[BuildEvent], None] = print_event,
+    ):
+
+        if platform.system() not in {"Windows", "Linux", "Darwin", "GNU"}:
+            raise RuntimeError(f"Unsupported '{platform.system()}' platform")
+
+        self.ext = ext
+        self.build_folder = str(Path(build_folder).absolute())
+        self.ext_dir = Path(ext_dir).absolute()
+        self.cmake_install_prefix = self.ext_dir / ext.install_prefix
+        self.cmake_defines = list(cmake_defines)
+        self.cmake_component = cmake_component
+        self.symlink_install = symlink_install
+        self.fetchcontent_cache = fetchcontent_cache
+        self.cmake_depends_on = list(cmake_depends_on)
+        self.env = dict(os.environ if env is None else env)
+        self.on_event = on_event
+
+        # The remote workers of the distributed compilation, resolved when configuring
+        self.hosts = None
+
+    async def run(self) -> None:
+        """
+        Configure, build, and install the CMake project.
+        """
+
+        await self.configure()
+        await self.build()
+        await self.install()
+        await self.finalize()
+        await self.profile()
+
+    async def configure(self) -> None:
+        """
+        Configure the CMake project.
+
+        If the FetchContent cache is enabled, the dependency sources populated by the
+        configuration are stored in the cache. Configuring the project is therefore
+        also the step that prefetches the sources in the cache.
+        """
+
+        # Make sure that the build folder exists
+        Path(self.build_folder).mkdir(exist_ok=True, parents=True)
+
+        if self.ext.normalize_paths:
+            script = prefix_map_script(
+                roots=self.prefix_map_roots(), include=self.user_project_include()
+            )
+            (Path(self.build_folder) / PREFIX_MAP_SCRIPT).write_text(script)
+
+        # The dependency provider of the FetchContent cache requires CMake >= 3.24
+        if self.fetchcontent_cache is not None:
+            if await self._cmake_version() < (3, 24):
+                message = "The FetchContent cache requires CMake >= 3.24, disabling it"
+                self._emit(phase="configure", kind="output", message=message)
+                self.fetchcontent_cache = None
+
+        if self.fetchcontent_cache is not None:
+            script = self.fetchcontent_cache.provider_script(self.build_folder)
+            (Path(self.build_folder) / FETCHCONTENT_PROVIDER_SCRIPT).write_text(script)
+
+        # Store the remote exec launcher of '{host}' templates in the build folder
+        dc = self.ext.distributed_compile
+
+        if dc is not None and "{host}" in dc.launcher:
+            dc.write_launcher(self.build_folder)
+
+        await self._resolve_hosts(phase="configure")
+
+        await self._run_command(
+            phase="configure", command=self.configure_command(), env=self._cmake_env()
+        )
+
+        if self.fetchcontent_cache is not None:
+            loop = asyncio.get_running_loop()
+            added = await loop.run_in_executor(
+                None, self.fetchcontent_cache.harvest, self.build_folder
+            )
+
+            for path in added:
+                message = f"-- Cached FetchContent sources: {path}"
+                self._emit(phase="configure", kind="output", message=message)
+
+    async def build(self) -> None:
+        """
+        Build the configured CMake project.
+        """
+
+        await self._resolve_hosts(phase="build")
+
+        env = self._cmake_env()
+
+        # Let ccache rewrite the absolute paths of the compile commands
+        if self.ext.normalize_paths:
+            env.setdefault("CCACHE_BASEDIR", self.ext.source_dir)
+
+        if self.ext.distributed_compile is not None:
+            env.update(self.ext.distributed_compile.environment(hosts=self.hosts))
+
+        await self._run_command(phase="build", command=self.build_command(), env=env)
+
+    async def install(self) -> None:
+        """
+        Install the built CMake project in the install prefix.
+
+        Multiple components are installed in a parallel batch, that is cancelled if
+        any of the installations fails. CMake only copies the files that changed
+        since the last installation, and the files that were installed previously but
+        are no longer part of the install manifest are removed from the install prefix.
+        """
+
+        env = self._cmake_env()
+
+        # Install symlinks pointing to the build tree. The installed files are then
+        # updated by just rebuilding the project, without installing it again.
+        if self.symlink_install:
+            env["CMAKE_INSTALL_MODE"] = "ABS_SYMLINK_OR_COPY"
+
+        tasks = [
+            asyncio.ensure_future(
+                self._run_command(phase="install", command=command, env=env)
+            )
+            for command in self.install_commands()
+        ]
+
+        try:
+            await asyncio.gather(*tasks)
+
+        except BaseException:
+            # Cancel the other installations, terminating their processes
+            for task in tasks:
+                task.cancel()
+
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        self.remove_stale_files()
+
+        if self.ext.normalize_paths:
+            self.check_absolute_paths()
+
+    async def finalize(self) -> None:
+        """
+        Write the additional Python files in the install prefix.
+        """
+
+        self._emit(phase="finalize", kind="started")
+        self.write_top_level_init()
+        self.write_bin_main()
+        self._emit(phase="finalize", kind="finished")
+
+    async def profile(self) -> None:
+        """
+        Profile the import of the installed package.
+
+        The package is imported in clean subprocesses, and the profile is stored in a
+        JSON report in the build folder. It is performed only if the profile_import
+        or the import_budget options of the CMakeExtension are set.
+
+        Raises:
+            RuntimeError: If the import exceeds the budget.
+        """
+
+        if not self.ext.profile_import and self.ext.import_budget is None:
+            return
+
+        package = ".".join(Path(self.ext.install_prefix).parts)
+
+        if package == "":
+            message = f"Extension '{self.ext.name}' has no install_prefix to profile"
+            self._emit(phase="profile", kind="output", message=message)
+            return
+
+        self._emit(phase="profile", kind="started", message=f"import {package}")
+
+        loop = asyncio.get_running_loop()
+        profile = await loop.run_in_executor(
+            None, profile_import, package, str(self.ext_dir), self.env
+        )
+
+        report_name = IMPORT_PROFILE_REPORT.format(name=self.ext.name)
+        report = Path(self.build_folder) / report_name
+        report.write_text(json.dumps(profile._asdict(), indent=2))
+
+        self._emit(
+            phase="profile",
+            kind="output",
+            message=f"-- Import of '{package}': {profile.import_time:.1f} ms, "
+            f"{profile.loaded_objects} shared objects, "
+            f"{profile.relocations} relocations (report: {report})",
+        )
+
+        if self.ext.import_budget is not None:
+
+            exceeded = check_budget(profile=profile, budget=self.ext.import_budget)
+
+            if len(exceeded) > 0:
+                self._emit(phase="profile", kind="failed", message="; ".join(exceeded))
+                raise RuntimeError(
+                    f"Import of '{package}' exceeds the budget: {'; '.join(exceeded)}"
+                )
+
+        self._emit(phase="profile", kind="finished")
+
+    def configure_command(self) -> List[str]:
+        """
+        Compose the CMake configure command.
+
+        Returns:
+            The CMake configure command.
+        """
+
+        ext = self.ext
+
+        # Initialize the CMake configuration arguments
+        configure_args = []
+
+        # Select the appropriate generator and accompanying settings
+        if ext.cmake_generator is not None:
+            configure_args += ["-G", ext.cmake_generator]
+
+            if ext.cmake_generator == "Ninja":
+                # Fix #26: https://github.com/diegoferigo/cmake-build-extension/issues/26
+                configure_args += [f"-DCMAKE_MAKE_PROGRAM={shutil.which('ninja')}"]
+
+        # CMake configure arguments
+        configure_args += [
+            f"-DCMAKE_BUILD_TYPE={ext.cmake_build_type}",
+            f"-DCMAKE_INSTALL_PREFIX:PATH={self.cmake_install_prefix}",
+        ]
+
+        # Extend the configure arguments with those passed from the extension
+        configure_args += ext.cmake_configure_options
+
+        # Plug in the distributed compilation backend
+        if ext.distributed_compile is not None and self.hosts is not None:
+            configure_args += ext.distributed_compile.cmake_options(
+                hosts=self.hosts, build_folder=self.build_folder
+            )
+
+        # Extend the configure arguments with those passed from the command line
+        configure_args += self.cmake_defines
+
+        # Point FetchContent to the cached dependency sources. The option comes after
+        # those passed by the user, whose top level includes are kept.
+        if self.fetchcontent_cache is not None:
+            includes = self.user_cache_variable("CMAKE_PROJECT_TOP_LEVEL_INCLUDES")
+            configure_args += self.fetchcontent_cache.cmake_options(
+                build_folder=self.build_folder,
+                includes=[] if includes is None else includes.split(";"),
+            )
+
+        # Map the absolute source and build roots to stable paths. The option comes
+        # last, and the script includes the CMAKE_PROJECT_INCLUDE passed by the user.
+        if ext.normalize_paths:
+            script = Path(self.build_folder) / PREFIX_MAP_SCRIPT
+            configure_args += [f"-DCMAKE_PROJECT_INCLUDE:FILEPATH={script}"]
+
+        return [
+            "cmake",
+            "-S",
+            ext.source_dir,
+            "-B",
+            self.build_folder,
+        ] + configure_args
+
+    def user_project_include(self) -> Optional[str]:
+        """
+        Return the CMAKE_PROJECT_INCLUDE script passed in the configure options.
+
+        Returns:
+            The path of the script passed by the user, or None if it is not passed.
+        """
+
+        return self.user_cache_variable(name="CMAKE_PROJECT_INCLUDE")
+
+    def user_cache_variable(self, name: str) -> Optional[str]:
+        """
+        Return the value of a CMake cache variable passed in the configure options.
+
+        Args:
+            name: The name of the cache variable.
+
+        Returns:
+            The last value passed by the user, or None if it is not passed.
+        """
+
+        value = None
+        options = list(self.ext.cmake_configure_options) + self.cmake_defines
+
+        # Support both the '-DVAR=value' and the '-D VAR=value' forms
+        for previous, option in zip([""] + options, options):
+
+            if option.startswith("-D"):
+                option = option[2:]
+            elif previous != "-D":
+                continue
+
+            variable, _, variable_value = option.partition("=")
+
+            if variable.partition(":")[0] == name:
+                value = variable_value or None
+
+        return value
+
+    def build_command(self) -> List[str]:
+        """
+        Compose the CMake build command.
+
+        Returns:
+            The CMake build command.
+        """
+
+        build_args = ["--config", self.ext.cmake_build_type]
+
+        # Size the parallel level from the reachable remote workers
+        if self.ext.distributed_compile is not None and self.hosts is not None:
+            parallel_level = self.ext.distributed_compile.parallel_level(self.hosts)
+            build_args += ["--parallel", str(parallel_level)]
+
+        return ["cmake", "--build", self.build_folder] + build_args
+
+    def components(self) -> List[Optional[str]]:
+        """
+        Return the CMake components to install.
+
+        Returns:
+            The list of unique component names, in the order they have been
+            specified, or [None] to install all the components.
+        """
+
+        # The component passed to the builder has higher priority than the
+        # cmake_component option of the CMakeExtension
+        component = (
+            self.cmake_component
+            if self.cmake_component is not None
+            else self.ext.cmake_component
+        )
+
+        if component is None:
+            return [None]
+
+        if isinstance(component, str):
+            component = component.split(";")
+
+        # Remove duplicates, that would be installed concurrently by parallel batches
+        return list(dict.fromkeys(c for c in component if c))
+
+    def install_commands(self) -> List[List[str]]:
+        """
+        Compose the CMake install commands, one for each component.
+
+        Returns:
+            The list of CMake install commands.
+        """
+
+        install_args = ["--config", self.ext.cmake_build_type]
+        install_command = ["cmake", "--install", self.build_folder] + install_args
+
+        return [
+            install_command + ([] if c is None else ["--component", c])
+            for c in self.components()
+        ]
+
+    def installed_files(self) -> List[str]:
+        """
+        Return the files installed by the last installation.
+
+        Returns:
+            The list of absolute paths read from the CMake install manifests.
+        """
+
+        files = []
+
+        for component in self.components():
+
+            name = (
+                "install_manifest.txt"
+                if component is None
+                else f"install_manifest_{component}.txt"
+            )
+
+            manifest = Path(self.build_folder) / name
+
+            if manifest.is_file():
+                files += [f for f in manifest.read_text().splitlines() if f]
+
+        return files
+
+    def remove_stale_files(self) -> None:
+        """
+        Remove from the install prefix the files that were installed previously but are
+        not part of the last installation.
+
+        The installed files are tracked in a manifest stored in the build folder.
+        """
+
+        manifest_name = INSTALLED_FILES_MANIFEST.format(name=self.ext.name)
+        manifest = Path(self.build_folder) / manifest_name
+        installed_files = self.installed_files()
+
+        previous_files = manifest.read_text().splitlines() if manifest.is_file() else []
+
+        for file in sorted(set(previous_files) - set(installed_files)):
+
+            path = Path(file)
+
+            # Only remove files that belong to the install prefix
+            if self.cmake_install_prefix not in path.parents:
+                continue
+
+            if path.is_file() or path.is_symlink():
+                self._emit(
+                    phase="install", kind="output", message=f"-- Removing stale: {path}"
+                )
+                path.unlink()
+
+        manifest.write_text("\n".join(installed_files))
+
+    def prefix_map_roots(self) -> Dict[str, str]:
+        """
+        Return the absolute roots normalized by the prefix maps.
+
+        The install prefix is not part of the compile options, so that extensions
+        sharing the build folder do not recompile the objects.
+
+        Returns:
+            A dictionary mapping the absolute roots to their stable paths, sorted so
+            that roots contained in other roots come after them.
+        """
+
+        roots = {
+            self.ext.source_dir: NORMALIZED_SOURCE_DIR,
+            self.build_folder: NORMALIZED_BUILD_DIR,
+        }
+
+        return {r: roots[r] for r in sorted(roots, key=len)}
+
+    def check_absolute_paths(self) -> None:
+        """
+        Report the installed files still containing the absolute source, build, or
+        install roots.
+        """
+
+        roots = list(self.prefix_map_roots()) + [str(self.cmake_install_prefix)]
+        leftovers = find_absolute_paths(files=self.installed_files(), roots=roots)
+
+        for file, roots in leftovers.items():
+            self._emit(
+                phase="install",
+                kind="output",
+                message=f"-- Absolute paths {roots} found in: {file}",
+            )
+
+    def write_top_level_init(self) -> None:
+        """
+        Write content to the top-level __init__.py.
+        """
+
+        if self.ext.write_top_level_init is None:
+            return
+
+        with open(file=self.cmake_install_prefix / "__init__.py", mode="w") as f:
+            f.write(self.ext.write_top_level_init)
+
+    def write_bin_main(self) -> None:
+        """
+        Write content to the bin/__main__.py magic file to expose binaries.
+        """
+
+        if len(self.ext.expose_binaries) == 0:
+            return
+
+        bin_dirs = {str(Path(d).parents[0]) for d in self.ext.expose_binaries}
+
+        main_py = inspect.cleandoc(
+            f"""
+            from pathlib import Path
+            import subprocess
+            import sys
+
+            def main():
+
+                binary_name = Path(sys.argv[0]).name
+                prefix = Path(__file__).parent.parent
+                bin_dirs = {str(bin_dirs)}
+
+                binary_path = ""
+
+                for dir in bin_dirs:
+                    path = prefix / Path(dir) / binary_name
+                    if path.is_file():
+                        binary_path = str(path)
+                        break
+
+                    path = Path(str(path) + ".exe")
+                    if path.is_file():
+                        binary_path = str(path)
+                        break
+
+                if not Path(binary_path).is_file():
+                    name = binary_path if binary_path != "" else binary_name
+                    raise RuntimeError(f"Failed to find binary: {{ name }}")
+
+                sys.argv[0] = binary_path
+
+                result = subprocess.run(args=sys.argv, capture_output=False)
+                exit(result.returncode)
+
+            if __name__ == "__main__" and len(sys.argv) > 1:
+                sys.argv = sys.argv[1:]
+                main()"""
+        )
+
+        bin_folder = self.cmake_install_prefix / "bin"
+        Path(bin_folder).mkdir(exist_ok=True, parents=True)
+        with open(file=bin_folder / "__main__.py", mode="w") as f:
+            f.write(main_py)
+
+    def _cmake_env(self) -> Dict[str, str]:
+        """
+        Return the environment of the CMake processes.
+
+        The CMAKE_PREFIX_PATH is extended with the location of the packages listed in
+        the cmake_depends_on option of the CMakeExtension and of the builder.
+        """
+
+        env = dict(self.env)
+        packages = list(self.ext.cmake_depends_on) + self.cmake_depends_on
+
+        for pkg in dict.fromkeys(packages):
+
+            spec = importlib.util.find_spec(pkg)
+
+            if spec is None or spec.origin is None:
+                raise ValueError(f"Failed to import '{pkg}'")
+
+            path = str(Path(spec.origin).parent)
+
+            if env.get("CMAKE_PREFIX_PATH"):
+                env["CMAKE_PREFIX_PATH"] = path + os.pathsep + env["CMAKE_PREFIX_PATH"]
+            else:
+                env["CMAKE_PREFIX_PATH"] = path
+
+        return env
+
+    async def _cmake_version(self) -> Tuple[int, int]:
+        """
+        Detect the version of CMake.
+
+        Returns:
+            The major and minor version numbers.
+
+        Raises:
+            RuntimeError: If the version cannot be detected.
+        """
+
+        process = await asyncio.create_subprocess_exec(
+            "cmake",
+            "--version",
+            env=self._cmake_env(),
+            stdout=asyncio.subprocess.PIPE,
+        )
+
+        stdout, _ = await process.communicate()
+        match = re.search(r"version (\d+)\.(\d+)", stdout.decode(errors="replace"))
+
+        if match is None:
+            raise RuntimeError("Failed to detect the version of CMake")
+
+        return int(match.group(1)), int(match.group(2))
+
+    async def _resolve_hosts(self, phase: str) -> None:
+        """
+        Resolve the reachable remote workers of the distributed compilation.
+
+        Args:
+            phase: The phase of the pipeline resolving the workers.
+        """
+
+        if self.ext.distributed_compile is None or self.hosts is not None:
+            return
+
+        loop = asyncio.get_running_loop()
+        self.hosts = await loop.run_in_executor(
+            None, self.ext.distributed_compile.reachable_hosts
+        )
+
+        if len(self.hosts) == 0:
+            message = "No remote worker reachable, falling back to local compilation"
+            self._emit(phase=phase, kind="output", message=message)
+
+    async def _run_command(
+        self, phase: str, command: List[str], env: Dict[str, str]
+    ) -> None:
+        """
+        Run a command, emitting its output as progress events.
+
+        Raises:
+            subprocess.CalledProcessError: If the command returns a non-zero code.
+        """
+
+        self._emit(phase=phase, kind="started", message=" ".join(command))
+
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            env=env,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+        )
+
+        def emit_output(line: bytes) -> None:
+
+            message = line.decode(errors="replace").rstrip()
+            self._emit(phase=phase, kind="output", message=message)
+
+        try:
+            # Read in chunks, a line can be longer than the limit of readline()
+            pending = b""
+
+            while True:
+                chunk = await process.stdout.read(OUTPUT_CHUNK_SIZE)
+
+                if not chunk:
+                    break
+
+                *lines, pending = (pending + chunk).split(b"\n")
+
+                for line in lines:
+                    emit_output(line=line)
+
+            if pending:
+                emit_output(line=pending)
+
+            returncode = await process.wait()
+
+        except BaseException as exception:
+            if process.returncode is None:
+                process.terminate()
+                await process.wait()
+
+            if isinstance(exception, asyncio.CancelledError):
+                self._emit(phase=phase, kind="cancelled")
+
+            raise
+
+        if returncode != 0:
+            self._emit(phase=phase, kind="failed", message=str(returncode))
+            raise subprocess.CalledProcessError(returncode=returncode, cmd=command)
+
+        self._emit(phase=phase, kind="finished")
+
+    def _emit(self, phase: str, kind: str, message: str = "") -> None:
+
+        if self.on_event is not None:
+            event = BuildEvent(
+                extension=self.ext.name, phase=phase, kind=kind, message=message
+            )
+            self.on_event(event)
@@ -1,8 +1,11 @@
 from pathlib import Path
-from typing import List
+from typing import List, Union
 
 from setuptools import Extension
 
+from .distributed_compile import DistributedCompile
+from .import_profiler import ImportBudget
+
 
 class CMakeExtension(Extension):
     """
@@ -13,15 +16,33 @@ class CMakeExtension(Extension):
         install_prefix: The path relative to the site-package directory where the CMake
             project is installed (typically the name of the Python package).
         disable_editable: Skip this extension in editable mode.
+        editable_symlinks: In editable mode, install symlinks to the outputs of the
+            build tree instead of copies. Rebuilding the CMake project is then enough
+            to update the in-source package. Requires CMake >= 3.22, older versions
+            install copies.
         write_top_level_init: Create a new top-level ``__init__.py`` file in the install
             prefix and write content.
         cmake_configure_options: List of additional CMake configure options (-DBAR=FOO).
         source_dir: The location of the main CMakeLists.txt.
         cmake_build_type: The default build type of the CMake project.
-        cmake_component: The name of component to install. Defaults to all components.
+        cmake_component: The name of component to install, or a list of names.
+            Defaults to all components.
         cmake_depends_on: List of dependency packages containing required CMake projects.
         expose_binaries: List of binary paths to expose, relative to top-level directory.
         cmake_generator: The generator to be used by CMake. Defaults to Ninja.
+        distributed_compile: The optional distributed compilation backend.
+        normalize_paths: Map the absolute source and build roots to stable paths in
+            the compiled objects, and report the installed files still containing
+            them or the install root. It makes the compiler caches hit across
+            temporary build folders and checkouts.
+        profile_import: Profile the import of the installed package in a clean
+            subprocess, storing a JSON report in the build folder.
+        import_budget: The optional budget of the import. If exceeded, the build
+            fails. Setting it also enables profile_import.
+        cmake_variant_variables: Names, or patterns, of the CMake cache variables
+            whose values may differ between the extensions sharing the build folder,
+            typically the switches selecting the targets to build. Extensions share
+            the build folder only if all their other configure options are equal.
     """
 
     def __init__(
@@ -29,14 +50,20 @@ class CMakeExtension(Extension):
         name: str,
         install_prefix: str = "",
         disable_editable: bool = False,
+        editable_symlinks: bool = False,
         write_top_level_init: str = None,
         cmake_configure_options: List[str] = (),
         source_dir: str = str(Path(".").absolute()),
         cmake_build_type: str = "Release",
-        cmake_component: str = None,
+        cmake_component: Union[str, List[str]] = None,
         cmake_depends_on: List[str] = (),
         expose_binaries: List[str] = (),
         cmake_generator: str = "Ninja",
+        distributed_compile: DistributedCompile = None,
+        normalize_paths: bool = False,
+        profile_import: bool = False,
+        import_budget: ImportBudget = None,
+        cmake_variant_variables: List[str] = (),
     ):
 
         super().__init__(name=name, sources=[])
@@ -50,6 +77,7 @@ class CMakeExtension(Extension):
         self.install_prefix = install_prefix
         self.cmake_build_type = cmake_build_type
         self.disable_editable = disable_editable
+        self.editable_symlinks = editable_symlinks
         self.write_top_level_init = write_top_level_init
         self.cmake_depends_on = cmake_depends_on
         self.source_dir = str(Path(source_dir).absolute())
@@ -57,3 +85,8 @@ class CMakeExtension(Extension):
         self.cmake_component = cmake_component
         self.expose_binaries = expose_binaries
         self.cmake_generator = cmake_generator
+        self.distributed_compile = distributed_compile
+        self.normalize_paths = normalize_paths
+        self.profile_import = profile_import
+        self.import_budget = import_budget
+        self.cmake_variant_variables = cmake_variant_variables
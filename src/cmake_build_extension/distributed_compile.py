@@ -0,0 +1,213 @@
+import os
+import shlex
+import shutil
+import socket
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from . import remote_exec
+
+# Name of the copy of the remote exec launcher stored in the build folder
+REMOTE_EXEC_SCRIPT = "cmake_build_extension_remote_exec.py"
+
+
+class DistributedCompile(NamedTuple):
+    """
+    NamedTuple that stores the configuration of a distributed compilation backend.
+
+    The backend is plugged in CMake as compiler launcher, therefore it is supported
+    only by the Makefile and Ninja generators. The parallel level of the build is
+    computed from the remote workers that are reachable when the build starts. If no
+    worker is reachable, the project is compiled locally using all the local cores.
+
+    Args:
+        launcher: The compiler launcher (e.g. 'distcc' or 'icecc'). If it contains the
+            '{host}' placeholder, it is instead a generic remote exec command template
+            that is prepended to each compile command after the placeholder has been
+            replaced with one of the reachable hosts.
+        hosts: The remote workers, in the 'host[:port][/slots]' format.
+        jobs_per_host: The number of parallel jobs of the hosts not specifying slots.
+        hosts_env: If set, the environment variable filled with the reachable hosts
+            (e.g. 'DISTCC_HOSTS').
+        default_port: The port of the hosts not specifying it.
+        timeout: The timeout in seconds used to check if a host is reachable.
+
+    Example:
+
+        A local stand-in worker pool can be obtained by starting few processes
+        listening on different localhost ports, and using a template that executes
+        the compile command locally:
+
+        DistributedCompile(
+            launcher="env WORKER={host}",
+            hosts=["127.0.0.1:9001/2", "127.0.0.1:9002/2", "127.0.0.1:9003/2"],
+        )
+    """
+
+    launcher: str
+    hosts: List[str]
+    jobs_per_host: int = 1
+    hosts_env: Optional[str] = None
+    default_port: int = 3632
+    timeout: float = 1.0
+
+    def parse_host(self, host: str) -> Tuple[str, int, int]:
+        """
+        Parse a host specification.
+
+        Args:
+            host: The host in the 'host[:port][/slots]' format.
+
+        Returns:
+            A tuple containing the host name, the port, and the number of slots.
+        """
+
+        address, _, slots = host.partition("/")
+        name, _, port = address.partition(":")
+
+        return (
+            name,
+            int(port) if port else self.default_port,
+            int(slots) if slots else self.jobs_per_host,
+        )
+
+    def is_reachable(self, host: str) -> bool:
+        """
+        Check if a host accepts connections.
+
+        Args:
+            host: The host in the 'host[:port][/slots]' format.
+
+        Returns:
+            True if the host is reachable, False otherwise.
+        """
+
+        name, port, _ = self.parse_host(host=host)
+
+        try:
+            with socket.create_connection((name, port), timeout=self.timeout):
+                return True
+        except OSError:
+            return False
+
+    def reachable_hosts(self) -> List[str]:
+        """
+        Return the hosts that are currently reachable.
+
+        Returns:
+            The list of reachable hosts, in the order they have been specified.
+        """
+
+        if len(self.hosts) == 0:
+            return []
+
+        with ThreadPoolExecutor(max_workers=len(self.hosts)) as executor:
+            reachable = list(executor.map(self.is_reachable, self.hosts))
+
+        return [h for h, r in zip(self.hosts, reachable) if r]
+
+    def parallel_level(self, hosts: List[str]) -> int:
+        """
+        Compute the parallel level of the build.
+
+        Args:
+            hosts: The reachable hosts.
+
+        Returns:
+            The total number of slots of the hosts, or the number of local cores if
+            no host is reachable.
+        """
+
+        if len(hosts) == 0:
+            return os.cpu_count() or 1
+
+        return sum(self.parse_host(host=h)[2] for h in hosts)
+
+    def write_launcher(self, build_folder: str) -> Path:
+        """
+        Copy the remote exec launcher used by '{host}' templates in the build folder.
+
+        The launcher stored in the CMake cache must outlive the environment of the
+        build, e.g. the temporary isolated environment created by pip, so that the
+        project can also be rebuilt by running 'cmake --build' manually.
+
+        Args:
+            build_folder: The CMake build folder.
+
+        Returns:
+            The path of the launcher script.
+        """
+
+        script = Path(build_folder) / REMOTE_EXEC_SCRIPT
+        shutil.copyfile(src=remote_exec.__file__, dst=script)
+
+        return script
+
+    def cmake_options(self, hosts: List[str], build_folder: str) -> List[str]:
+        """
+        Return the CMake configure options that plug in the compiler launcher.
+
+        The configuration of the remote exec launcher used by '{host}' templates is
+        passed as launcher arguments, so that it does not depend on the environment.
+
+        Args:
+            hosts: The reachable hosts.
+            build_folder: The CMake build folder containing the launcher script.
+
+        Returns:
+            The list of CMake configure options. If no host is reachable, the options
+            reset the compiler launcher possibly stored in the CMake cache.
+        """
+
+        if len(hosts) == 0:
+            launcher = []
+
+        elif "{host}" in self.launcher:
+            if ";" in self.launcher:
+                raise ValueError(f"Launcher '{self.launcher}' cannot contain ';'")
+
+            # The base interpreter outlives virtual environments, the launcher only
+            # needs the standard library
+            python = getattr(sys, "_base_executable", sys.executable)
+
+            launcher = [
+                python,
+                "-S",
+                str(Path(build_folder).absolute() / REMOTE_EXEC_SCRIPT),
+                "--template",
+                self.launcher,
+                "--port",
+                str(self.default_port),
+                "--timeout",
+                str(self.timeout),
+                *[arg for host in hosts for arg in ("--host", host)],
+                "--",
+            ]
+
+        else:
+            launcher = shlex.split(self.launcher)
+
+        return [
+            f"-DCMAKE_{lang}_COMPILER_LAUNCHER={';'.join(launcher)}"
+            for lang in ("C", "CXX")
+        ]
+
+    def environment(self, hosts: List[str]) -> Dict[str, str]:
+        """
+        Return the environment variables consumed by the compiler launcher.
+
+        Args:
+            hosts: The reachable hosts.
+
+        Returns:
+            The dictionary of environment variables to add to the build environment.
+        """
+
+        env = {}
+
+        if self.hosts_env is not None:
+            env[self.hosts_env] = " ".join(hosts)
+
+        return env
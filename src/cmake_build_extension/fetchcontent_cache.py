@@ -0,0 +1,186 @@
+import os
+import shutil
+from pathlib import Path
+from typing import List, Sequence
+
+from .file_lock import file_lock
+
+# Environment variable that can be used to enable the cache without build_ext options
+FETCHCONTENT_CACHE_ENV = "CMAKE_BUILD_EXTENSION_FETCHCONTENT_CACHE"
+
+# Name of the CMake script in the build folder registering the dependency provider
+FETCHCONTENT_PROVIDER_SCRIPT = "cmake_build_extension_fetchcontent_provider.cmake"
+
+# Name of the file in the build folder listing the sources populated by FetchContent
+FETCHCONTENT_SOURCES_FILE = "cmake_build_extension_fetchcontent_sources.txt"
+
+
+class FetchContentCache:
+    """
+    Persistent cache of the dependency sources populated by CMake FetchContent.
+
+    The cache is plugged in CMake as a dependency provider (requires CMake >= 3.24)
+    serving the dependencies made available with FetchContent_MakeAvailable. Each
+    cached source folder is identified by the name of the dependency and by a hash of
+    its declared details (e.g. URL and URL_HASH, or GIT_REPOSITORY and GIT_TAG), so
+    that changing the declaration of a dependency does not reuse stale sources.
+
+    After a configuration, the sources populated by FetchContent are copied in the
+    cache. The following configurations of any project using the cache point
+    FetchContent to the cached sources of the dependencies they declare, so that they
+    are neither downloaded nor extracted again, and work also without network.
+
+    Args:
+        cache_dir: The folder storing the cached sources.
+    """
+
+    def __init__(self, cache_dir: str):
+
+        self.cache_dir = Path(cache_dir).absolute()
+
+    def cached_sources(self) -> List[Path]:
+        """
+        Return the cached source folders.
+
+        Returns:
+            The list of '<name>-<hash>-src' folders stored in the cache.
+        """
+
+        if not self.cache_dir.is_dir():
+            return []
+
+        return sorted(p for p in self.cache_dir.glob("*-src") if p.is_dir())
+
+    def provider_script(self, build_folder: str) -> str:
+        """
+        Generate the CMake script that registers the cache as dependency provider.
+
+        The provider points FetchContent to the cached sources of a dependency, if
+        they exist, and otherwise records the populated sources in a file of the build
+        folder, that is read when the sources are harvested.
+
+        Args:
+            build_folder: The CMake build folder.
+
+        Returns:
+            The content of the CMake script.
+        """
+
+        def quote(path: Path) -> str:
+            return path.as_posix().replace('"', '\\"')
+
+        cache_dir = quote(self.cache_dir)
+        sources_file = quote(Path(build_folder).absolute() / FETCHCONTENT_SOURCES_FILE)
+
+        return f"""\
+# Generated by cmake-build-extension
+file(WRITE "{sources_file}" "")
+
+macro(cmake_build_extension_provide_dependency method name)
+
+    # Identify the sources with the declared details, excluding the local folders
+    cmake_parse_arguments(_cbe_fc "" "SOURCE_DIR;BINARY_DIR;SUBBUILD_DIR" "" ${{ARGN}})
+    string(SHA256 _cbe_fc_key "${{_cbe_fc_UNPARSED_ARGUMENTS}}")
+    string(SUBSTRING "${{_cbe_fc_key}}" 0 16 _cbe_fc_key)
+
+    string(TOLOWER "${{name}}" _cbe_fc_lower)
+    string(TOUPPER "${{name}}" _cbe_fc_upper)
+    set(_cbe_fc_entry "${{_cbe_fc_lower}}-${{_cbe_fc_key}}")
+    set(_cbe_fc_cached "{cache_dir}/${{_cbe_fc_entry}}-src")
+
+    if(IS_DIRECTORY "${{_cbe_fc_cached}}")
+        # The call is not forwarded again to the provider
+        set(FETCHCONTENT_SOURCE_DIR_${{_cbe_fc_upper}} "${{_cbe_fc_cached}}")
+        FetchContent_MakeAvailable(${{name}})
+        unset(FETCHCONTENT_SOURCE_DIR_${{_cbe_fc_upper}})
+
+        # Do not store the cached sources in the CMake cache of the project
+        if("$CACHE{{FETCHCONTENT_SOURCE_DIR_${{_cbe_fc_upper}}}}"
+           STREQUAL "${{_cbe_fc_cached}}")
+            set_property(CACHE FETCHCONTENT_SOURCE_DIR_${{_cbe_fc_upper}}
+                PROPERTY VALUE "")
+        endif()
+    else()
+        FetchContent_MakeAvailable(${{name}})
+        FetchContent_GetProperties(${{name}})
+
+        # Dependencies found with find_package have no sources
+        if(${{_cbe_fc_lower}}_POPULATED AND ${{_cbe_fc_lower}}_SOURCE_DIR)
+            file(APPEND "{sources_file}"
+                "${{_cbe_fc_entry}};${{${{_cbe_fc_lower}}_SOURCE_DIR}}\\n")
+        endif()
+    endif()
+
+endmacro()
+
+cmake_language(
+    SET_DEPENDENCY_PROVIDER cmake_build_extension_provide_dependency
+    SUPPORTED_METHODS FETCHCONTENT_MAKEAVAILABLE_SERIAL)
+"""
+
+    def cmake_options(
+        self, build_folder: str, includes: Sequence[str] = ()
+    ) -> List[str]:
+        """
+        Return the CMake configure options that plug in the dependency provider.
+
+        Args:
+            build_folder: The CMake build folder containing the provider script.
+            includes: The CMAKE_PROJECT_TOP_LEVEL_INCLUDES passed by the user, that
+                are kept before the provider script.
+
+        Returns:
+            The list of CMake configure options.
+        """
+
+        script = Path(build_folder).absolute() / FETCHCONTENT_PROVIDER_SCRIPT
+        includes = [i for i in includes if i] + [str(script)]
+
+        return [f"-DCMAKE_PROJECT_TOP_LEVEL_INCLUDES:STRING={';'.join(includes)}"]
+
+    def harvest(self, build_folder: str) -> List[Path]:
+        """
+        Copy in the cache the sources populated by FetchContent in a build folder.
+
+        Args:
+            build_folder: The configured CMake build folder.
+
+        Returns:
+            The list of source folders added to the cache.
+        """
+
+        sources_file = Path(build_folder) / FETCHCONTENT_SOURCES_FILE
+
+        if not sources_file.is_file():
+            return []
+
+        added = []
+
+        with self.lock():
+
+            for line in sources_file.read_text().splitlines():
+
+                entry, _, src = line.partition(";")
+                dst = self.cache_dir / f"{entry}-src"
+
+                if dst.exists() or not Path(src).is_dir():
+                    continue
+
+                # Copy to a temporary folder and move it atomically in the cache
+                tmp = self.cache_dir / f".{entry}.{os.getpid()}.tmp"
+                shutil.rmtree(tmp, ignore_errors=True)
+                shutil.copytree(src=src, dst=tmp, symlinks=True)
+                os.replace(tmp, dst)
+
+                added.append(dst)
+
+        return added
+
+    def lock(self):
+        """
+        Context manager that locks the cache for exclusive access.
+
+        The lock is released also if the process holding it dies.
+        """
+
+        return file_lock(path=self.cache_dir / ".lock")
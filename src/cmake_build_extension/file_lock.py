@@ -0,0 +1,48 @@
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+
+@contextmanager
+def file_lock(path: Path):
+    """
+    Context manager that holds an exclusive lock on a file.
+
+    The lock is taken with the locking primitives of the OS, therefore it is released
+    also when the process holding it dies.
+
+    Args:
+        path: The path of the lock file, created if it does not exist.
+    """
+
+    Path(path).parent.mkdir(exist_ok=True, parents=True)
+
+    with open(file=path, mode="a+b") as f:
+
+        if os.name == "nt":
+            import msvcrt
+
+            f.seek(0)
+
+            # LK_LOCK gives up after 10 attempts, keep trying until the lock is taken
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+
+        else:
+            import fcntl
+
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+        try:
+            yield
+
+        finally:
+            if os.name == "nt":
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
@@ -0,0 +1,105 @@
+import time
+
+import setuptools
+
+from .build_folders import (
+    BuildFolderIndex,
+    folder_size,
+    prune_object_files,
+    select_evictions,
+)
+from .cmake_extension import CMakeExtension
+
+
+class BuildFoldersGC(setuptools.Command):
+    """
+    Custom command to report and garbage collect the build folders created by
+    BuildExtension.
+
+    BuildExtension creates a '{build_temp}_{name}' folder for each CMakeExtension and
+    tracks it in a small index. This command reports the size and the last use time
+    of the tracked folders, and evicts them by age, total size budget, or when the
+    extensions they belong to are no longer part of the project.
+
+    Example:
+
+        $ python setup.py gc_build_folders --max-age=7 --max-size=2048 --orphaned
+    """
+
+    description = "report and garbage collect the CMake build folders"
+
+    user_options = [
+        (
+            "build-temp=",
+            "t",
+            "the build_temp of build_ext (e.g. 'build/temp.linux-x86_64-cpython-311'), "
+            "the build folders are '{build_temp}_{name}'",
+        ),
+        ("list", "l", "only report the tracked build folders"),
+        ("max-age=", "a", "evict folders unused for more than the given days"),
+        ("max-size=", "s", "evict least recently used folders above the given MB"),
+        ("orphaned", "o", "evict folders of extensions no longer in ext_modules"),
+        ("prune-objects", "p", "delete object files of the kept folders"),
+    ]
+
+    boolean_options = ["list", "orphaned", "prune-objects"]
+
+    def initialize_options(self):
+
+        self.build_temp = None
+        self.list = False
+        self.max_age = None
+        self.max_size = None
+        self.orphaned = False
+        self.prune_objects = False
+
+    def finalize_options(self):
+
+        self.set_undefined_options("build_ext", ("build_temp", "build_temp"))
+
+        # Convert days to seconds and MB to bytes
+        self.max_age = None if self.max_age is None else float(self.max_age) * 86400
+        self.max_size = (
+            None if self.max_size is None else int(float(self.max_size) * 1024**2)
+        )
+
+    def run(self) -> None:
+
+        index = BuildFolderIndex.from_build_temp(build_temp=self.build_temp)
+        folders = index.entries()
+
+        print(f"==> Build folders tracked in '{index.index_file}':")
+
+        for folder in folders:
+            size = folder_size(folder.path) / 1024**2
+            age = (time.time() - folder.last_used) / 86400
+            print(f"{size:10.1f} MB  {age:6.1f} days  {folder.path}")
+
+        if self.list:
+            return
+
+        known_extensions = None
+
+        if self.orphaned:
+            known_extensions = [
+                e.name
+                for e in self.distribution.ext_modules or []
+                if isinstance(e, CMakeExtension)
+            ]
+
+        evicted = select_evictions(
+            folders=folders,
+            max_age=self.max_age,
+            max_size=self.max_size,
+            known_extensions=known_extensions,
+        )
+
+        for folder in evicted:
+            print(f"Evicting '{folder.path}'")
+            index.evict(folder=folder)
+
+        if self.prune_objects:
+            for folder in folders:
+                if folder not in evicted:
+                    freed = prune_object_files(path=folder.path) / 1024**2
+                    print(f"Pruned {freed:.1f} MB of object files from '{folder.path}'")
@@ -0,0 +1,220 @@
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# Line printed by 'python -X importtime': self [us] | cumulative [us] | package
+IMPORTTIME_LINE = re.compile(r"^import time:\s*(\d+)\s*\|\s*(\d+)\s*\|(\s*)(\S+)")
+
+# Line printed by the glibc dynamic loader with LD_DEBUG: <pid>: <message>
+LD_DEBUG_LINE = re.compile(r"^\s*(\d+):\s*(.*)$")
+
+
+class ImportBudget(NamedTuple):
+    """
+    NamedTuple that stores the budget of the import of a built package.
+
+    Args:
+        import_time: The maximum cumulative import time in milliseconds.
+        loaded_objects: The maximum number of shared objects loaded by the import.
+        relocations: The maximum number of symbol relocations caused by the import.
+    """
+
+    import_time: Optional[float] = None
+    loaded_objects: Optional[int] = None
+    relocations: Optional[int] = None
+
+
+class ImportProfile(NamedTuple):
+    """
+    NamedTuple that stores the profile of the import of a built package.
+
+    Args:
+        package: The name of the imported package.
+        import_time: The cumulative import time in milliseconds (best of the runs).
+        modules: The cumulative import time in milliseconds of the slowest modules.
+        loaded_objects: The number of shared objects loaded by the import. Only
+            available with the glibc dynamic loader.
+        relocations: The number of symbol relocations caused by the import. Only
+            available with the glibc dynamic loader.
+        loader_startup_cycles: The cycles spent by the dynamic loader at startup,
+            and the part of them spent in relocations. Only available with the glibc
+            dynamic loader.
+    """
+
+    package: str
+    import_time: float
+    modules: Dict[str, float]
+    loaded_objects: Optional[int] = None
+    relocations: Optional[int] = None
+    loader_startup_cycles: Optional[Dict[str, int]] = None
+
+
+def run_python(code: str, path: str, env: Dict[str, str]) -> Tuple[int, str]:
+    """
+    Run Python code in a clean subprocess, profiling imports and dynamic loading.
+
+    Args:
+        code: The code to run.
+        path: The folder prepended to PYTHONPATH.
+        env: The environment of the subprocess.
+
+    Returns:
+        A tuple containing the pid of the subprocess and its stderr.
+    """
+
+    env = dict(env)
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (path, env.get("PYTHONPATH")) if p)
+
+    if platform.system() == "Linux":
+        env["LD_DEBUG"] = "statistics,files"
+        env.pop("LD_DEBUG_OUTPUT", None)
+
+    # Run from an empty folder so that the package is not imported from the cwd
+    with tempfile.TemporaryDirectory() as cwd:
+        process = subprocess.Popen(
+            [sys.executable, "-s", "-X", "importtime", "-c", code],
+            cwd=cwd,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        )
+        _, stderr = process.communicate()
+
+    if process.returncode != 0:
+        raise RuntimeError(f"Failed to run '{code}':\n{stderr.decode()}")
+
+    return process.pid, stderr.decode(errors="replace")
+
+
+def parse_loader_statistics(pid: int, stderr: str) -> Dict[str, int]:
+    """
+    Parse the output of the glibc dynamic loader with LD_DEBUG=statistics,files.
+
+    Args:
+        pid: The pid of the profiled process.
+        stderr: The stderr of the profiled process.
+
+    Returns:
+        A dictionary containing the number of loaded objects, the final number of
+        relocations, and the startup cycles of the dynamic loader.
+    """
+
+    statistics = dict(loaded_objects=0)
+
+    for line in stderr.splitlines():
+
+        match = LD_DEBUG_LINE.match(line)
+
+        if match is None or int(match.group(1)) != pid:
+            continue
+
+        message = match.group(2)
+
+        if message.endswith("generating link map"):
+            statistics["loaded_objects"] += 1
+
+        for key, prefix in (
+            ("relocations", "final number of relocations:"),
+            ("startup_cycles", "total startup time in dynamic loader:"),
+            ("relocation_cycles", "time needed for relocation:"),
+        ):
+            if message.startswith(prefix):
+                statistics[key] = int(message[len(prefix) :].split()[0])
+
+    return statistics
+
+
+def profile_import(
+    package: str, path: str, env: Dict[str, str], runs: int = 3, top: int = 20
+) -> ImportProfile:
+    """
+    Profile the import of a package in clean subprocesses.
+
+    Args:
+        package: The name of the package to import.
+        path: The folder containing the package.
+        env: The environment of the subprocesses.
+        runs: The number of imports, the fastest one is reported.
+        top: The number of slowest modules to report.
+
+    Returns:
+        The profile of the import.
+    """
+
+    best = None
+
+    for _ in range(runs):
+
+        pid, stderr = run_python(code=f"import {package}", path=path, env=env)
+
+        modules = {}
+
+        for line in stderr.splitlines():
+            match = IMPORTTIME_LINE.match(line)
+            if match is not None:
+                modules[match.group(4)] = int(match.group(2)) / 1000
+
+        if package not in modules:
+            raise RuntimeError(f"Failed to profile the import of '{package}'")
+
+        if best is None or modules[package] < best[1][package]:
+            best = (pid, modules, stderr)
+
+    pid, modules, stderr = best
+    slowest = sorted(modules.items(), key=lambda m: m[1], reverse=True)[:top]
+
+    profile = ImportProfile(
+        package=package, import_time=modules[package], modules=dict(slowest)
+    )
+
+    if platform.system() != "Linux":
+        return profile
+
+    # Subtract the dynamic loading performed by the interpreter itself
+    baseline_pid, baseline_stderr = run_python(code="pass", path=path, env=env)
+    baseline = parse_loader_statistics(pid=baseline_pid, stderr=baseline_stderr)
+    statistics = parse_loader_statistics(pid=pid, stderr=stderr)
+
+    if "relocations" not in statistics or "relocations" not in baseline:
+        return profile
+
+    return profile._replace(
+        loaded_objects=statistics["loaded_objects"] - baseline["loaded_objects"],
+        relocations=statistics["relocations"] - baseline["relocations"],
+        loader_startup_cycles=dict(
+            total=statistics.get("startup_cycles"),
+            relocation=statistics.get("relocation_cycles"),
+        ),
+    )
+
+
+def check_budget(profile: ImportProfile, budget: ImportBudget) -> List[str]:
+    """
+    Check the profile of an import against its budget.
+
+    Args:
+        profile: The profile of the import.
+        budget: The budget of the import.
+
+    Returns:
+        The list of the exceeded budget entries.
+    """
+
+    exceeded = []
+
+    for key, unit in (
+        ("import_time", " ms"),
+        ("loaded_objects", ""),
+        ("relocations", ""),
+    ):
+        value = getattr(profile, key)
+        limit = getattr(budget, key)
+
+        if value is not None and limit is not None and value > limit:
+            exceeded.append(f"{key}: {value}{unit} > {limit}{unit}")
+
+    return exceeded
@@ -0,0 +1,80 @@
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Stable paths replacing the absolute source and build roots
+NORMALIZED_SOURCE_DIR = "/source"
+NORMALIZED_BUILD_DIR = "/build"
+
+
+def prefix_map_script(roots: Dict[str, str], include: Optional[str] = None) -> str:
+    """
+    Generate a CMake script that maps absolute roots to stable paths.
+
+    The script is meant to be passed as CMAKE_PROJECT_INCLUDE, so that it is processed
+    after the compilers are detected. GCC and Clang use -ffile-prefix-map, that also
+    covers -fdebug-prefix-map and -fmacro-prefix-map. MSVC trims the roots from the
+    recorded paths with /d1trimfile, and clang-cl forwards -ffile-prefix-map to Clang.
+
+    Args:
+        roots: A dictionary mapping the absolute roots to their stable paths. Roots
+            contained in other roots must come after them.
+        include: The optional CMAKE_PROJECT_INCLUDE script passed by the user, that
+            is included by the generated script.
+
+    Returns:
+        The content of the CMake script.
+    """
+
+    def quote(path: str) -> str:
+        return path.replace("\\", "\\\\").replace('"', '\\"')
+
+    file_prefix_maps = [f"-ffile-prefix-map={r}={m}" for r, m in roots.items()]
+    trimfiles = [f"/d1trimfile:{Path(r)}\\" for r in roots]
+
+    lines = [
+        "# Generated by cmake-build-extension",
+        'if(MSVC AND NOT CMAKE_C_COMPILER_ID MATCHES "Clang"',
+        '   AND NOT CMAKE_CXX_COMPILER_ID MATCHES "Clang")',
+        *[f'    add_compile_options("{quote(o)}")' for o in trimfiles],
+        "elseif(MSVC)",
+        *[f'    add_compile_options("/clang:{quote(o)}")' for o in file_prefix_maps],
+        "else()",
+        *[f'    add_compile_options("{quote(o)}")' for o in file_prefix_maps],
+        "endif()",
+    ]
+
+    if include is not None:
+        lines += [f'include("{quote(include)}")']
+
+    return "\n".join(lines) + "\n"
+
+
+def find_absolute_paths(files: List[str], roots: List[str]) -> Dict[str, List[str]]:
+    """
+    Find the absolute roots that are still contained in the given files.
+
+    Args:
+        files: The files to check, typically the installed files.
+        roots: The absolute roots to search.
+
+    Returns:
+        A dictionary mapping the files to the roots they contain.
+    """
+
+    leftovers = {}
+    patterns = {r: str(r).encode() for r in roots}
+
+    for file in files:
+
+        path = Path(file)
+
+        if not path.is_file():
+            continue
+
+        content = path.read_bytes()
+        found = [r for r, pattern in patterns.items() if pattern in content]
+
+        if len(found) > 0:
+            leftovers[file] = found
+
+    return leftovers
@@ -0,0 +1,52 @@
+import asyncio
+
+import setuptools
+
+from .cmake_extension import CMakeExtension
+
+
+class FetchContentPrefetch(setuptools.Command):
+    """
+    Custom command to populate the cache of the FetchContent dependency sources.
+
+    It configures all the CMakeExtension objects without building them, storing in the
+    cache the sources that FetchContent populates during the configuration. The
+    following builds using the same cache, also on builders without network access,
+    reuse the cached sources instead of downloading and extracting them again.
+
+    Example:
+
+        $ python setup.py prefetch --fetchcontent-cache=/var/cache/deps
+    """
+
+    description = "populate the cache of the FetchContent dependency sources"
+
+    user_options = [
+        ("fetchcontent-cache=", "F", "shared cache of the FetchContent sources"),
+    ]
+
+    def initialize_options(self):
+
+        self.fetchcontent_cache = None
+
+    def finalize_options(self):
+
+        self.set_undefined_options(
+            "build_ext", ("fetchcontent_cache", "fetchcontent_cache")
+        )
+
+        if self.fetchcontent_cache is None:
+            raise ValueError("No FetchContent cache folder specified")
+
+    def run(self) -> None:
+
+        build_ext = self.get_finalized_command("build_ext")
+        build_ext.fetchcontent_cache = self.fetchcontent_cache
+
+        for ext in build_ext.extensions:
+
+            if not isinstance(ext, CMakeExtension):
+                continue
+
+            builder = build_ext.cmake_builder(ext=ext)
+            asyncio.run(builder.configure())
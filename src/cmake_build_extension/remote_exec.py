@@ -0,0 +1,154 @@
+"""
+Compiler launcher running the compile commands through a remote exec command template.
+
+The build system executes this script for each translation unit, therefore it only
+imports modules of the standard library and it is not part of the package imports.
+"""
+
+import random
+import shlex
+import socket
+import subprocess
+import sys
+from typing import List, Optional, Tuple
+
+# Options of the launcher preceding the compile command, that is separated by '--':
+#   remote_exec.py --template <template> --port <port> --timeout <timeout>
+#                  [--host <host>]... -- <compile command>
+REMOTE_EXEC_OPTIONS = {"--template", "--port", "--timeout", "--host"}
+
+
+def is_reachable(address: str, default_port: int, timeout: float) -> bool:
+    """
+    Check if a host accepts connections.
+
+    Args:
+        address: The host in the 'host[:port]' format.
+        default_port: The port used if the address does not specify it.
+        timeout: The connection timeout in seconds.
+
+    Returns:
+        True if the host is reachable, False otherwise.
+    """
+
+    name, _, port = address.partition(":")
+
+    try:
+        with socket.create_connection(
+            (name, int(port) if port else default_port), timeout=timeout
+        ):
+            return True
+    except OSError:
+        return False
+
+
+def parse_args(argv: List[str]) -> Tuple[Optional[dict], List[str]]:
+    """
+    Split the arguments of the launcher in its configuration and the compile command.
+
+    Args:
+        argv: The arguments of the launcher.
+
+    Returns:
+        A tuple containing the configuration, or None if the arguments do not start
+        with a valid configuration, and the compile command.
+    """
+
+    if len(argv) == 0 or argv[0] != "--template" or "--" not in argv:
+        return None, argv
+
+    separator = argv.index("--")
+    options, args = argv[:separator], argv[separator + 1 :]
+
+    if len(options) % 2 != 0 or set(options[::2]) - REMOTE_EXEC_OPTIONS:
+        return None, argv
+
+    config = dict(hosts=[])
+
+    for option, value in zip(options[::2], options[1::2]):
+        if option == "--template":
+            config["template"] = value
+        elif option == "--port":
+            config["default_port"] = int(value)
+        elif option == "--timeout":
+            config["timeout"] = float(value)
+        else:
+            config["hosts"].append(value)
+
+    return config, args
+
+
+def remote_exec(
+    args: List[str],
+    template: str,
+    hosts: List[str],
+    default_port: int = 3632,
+    timeout: float = 1.0,
+) -> int:
+    """
+    Run a compile command through the remote exec command template.
+
+    The hosts are tried in random order, and the command is compiled locally if none
+    of them is reachable. If a remote command fails and its host is no longer
+    reachable, the worker is considered dropped out and the command is retried on the
+    next host.
+
+    Args:
+        args: The compile command.
+        template: The remote exec command template containing the '{host}'
+            placeholder.
+        hosts: The remote workers, in the 'host[:port][/slots]' format.
+        default_port: The port of the hosts not specifying it.
+        timeout: The timeout in seconds used to check if a host is reachable.
+
+    Returns:
+        The return code of the compile command.
+    """
+
+    hosts = list(hosts)
+    random.shuffle(hosts)
+
+    for host in hosts:
+        address = host.partition("/")[0]
+
+        if not is_reachable(address, default_port=default_port, timeout=timeout):
+            continue
+
+        command = shlex.split(template.replace("{host}", address)) + args
+        returncode = subprocess.call(command)
+
+        if returncode == 0:
+            return returncode
+
+        # A failure with the worker still reachable is a failure of the compilation
+        if is_reachable(address, default_port=default_port, timeout=timeout):
+            return returncode
+
+        print(f"Remote worker '{address}' dropped out, retrying", file=sys.stderr)
+
+    # Without reachable hosts, compile locally
+    return subprocess.call(args)
+
+
+def main(argv: List[str]) -> int:
+    """
+    Entry point of the launcher.
+
+    Args:
+        argv: The configuration of the launcher followed by the compile command.
+
+    Returns:
+        The return code of the compile command.
+    """
+
+    config, args = parse_args(argv=argv)
+
+    # Without a configuration, compile locally
+    if config is None:
+        return subprocess.call(args)
+
+    return remote_exec(args=args, **config)
+
+
+if __name__ == "__main__":
+    sys.exit(main(argv=sys.argv[1:]))
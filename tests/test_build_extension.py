@@ -0,0 +1,193 @@
+import sys
+from pathlib import Path
+from typing import List
+
+import pytest
+from setuptools import Distribution
+
+from cmake_build_extension import BuildExtension, CMakeExtension
+
+
+@pytest.fixture(autouse=True)
+def chdir(tmp_path: Path, monkeypatch) -> None:
+
+    # Do not infer the version of the project in the working directory
+    monkeypatch.chdir(tmp_path)
+
+
+def group_build_folders(*extensions: CMakeExtension) -> dict:
+
+    build_ext = BuildExtension(Distribution())
+    build_ext.inplace = False
+
+    return build_ext.group_build_folders(extensions=list(extensions))
+
+
+def example_extensions(source_dir: Path) -> List[CMakeExtension]:
+
+    # The extensions of example/setup.py
+    return [
+        CMakeExtension(
+            name="SwigBindings",
+            install_prefix="mymath_swig",
+            expose_binaries=["bin/print_answer"],
+            write_top_level_init="from . import bindings",
+            source_dir=str(source_dir),
+            cmake_configure_options=[
+                f"-DPython3_ROOT_DIR={Path(sys.prefix)}",
+                "-DCALL_FROM_SETUP_PY:BOOL=ON",
+                "-DBUILD_SHARED_LIBS:BOOL=OFF",
+                "-DEXAMPLE_WITH_SWIG:BOOL=ON",
+                "-DEXAMPLE_WITH_PYBIND11:BOOL=OFF",
+            ],
+            cmake_variant_variables=["EXAMPLE_WITH_*"],
+        ),
+        CMakeExtension(
+            name="Pybind11Bindings",
+            install_prefix="mymath_pybind11",
+            cmake_depends_on=["pybind11"],
+            expose_binaries=["bin/print_answer"],
+            write_top_level_init="from . import bindings",
+            source_dir=str(source_dir),
+            cmake_configure_options=[
+                f"-DPython3_ROOT_DIR={Path(sys.prefix)}",
+                "-DCALL_FROM_SETUP_PY:BOOL=ON",
+                "-DBUILD_SHARED_LIBS:BOOL=OFF",
+                "-DEXAMPLE_WITH_SWIG:BOOL=OFF",
+                "-DEXAMPLE_WITH_PYBIND11:BOOL=ON",
+            ],
+            cmake_variant_variables=["EXAMPLE_WITH_*"],
+        ),
+    ]
+
+
+def test_compatible_extensions_share_build_folder(tmp_path: Path) -> None:
+
+    groups = group_build_folders(
+        CMakeExtension(
+            name="a",
+            source_dir=str(tmp_path),
+            cmake_configure_options=["-DBUILD_A:BOOL=ON", "-DCMAKE_CXX_FLAGS=-O3"],
+            cmake_variant_variables=["BUILD_*"],
+        ),
+        CMakeExtension(
+            name="b",
+            source_dir=str(tmp_path),
+            cmake_configure_options=["-DCMAKE_CXX_FLAGS=-O3", "-DBUILD_A:BOOL=OFF"],
+            cmake_variant_variables=["BUILD_*"],
+        ),
+    )
+
+    assert groups == {"a": ("a", ["a", "b"]), "b": ("a", ["a", "b"])}
+
+
+def test_different_values_are_not_grouped(tmp_path: Path) -> None:
+
+    # Extensions changing the shared targets do not share the build folder
+    extensions = [
+        CMakeExtension(
+            name=name,
+            source_dir=str(tmp_path),
+            cmake_configure_options=[
+                f"-DBUILD_SHARED_LIBS:BOOL={value}",
+                f"-DBUILD_{name.upper()}:BOOL=ON",
+            ],
+            cmake_variant_variables=["BUILD_A", "BUILD_B"],
+        )
+        for name, value in (("a", "ON"), ("b", "OFF"))
+    ]
+
+    groups = group_build_folders(*extensions)
+
+    assert groups == {"a": ("a", ["a"]), "b": ("b", ["b"])}
+
+
+def test_different_toolchains_are_not_grouped(tmp_path: Path) -> None:
+
+    extensions = [
+        CMakeExtension(
+            name=name,
+            source_dir=str(tmp_path),
+            cmake_configure_options=[f"-DCMAKE_TOOLCHAIN_FILE={name}.cmake"],
+        )
+        for name in ("a", "b")
+    ]
+
+    groups = group_build_folders(*extensions)
+
+    assert groups == {"a": ("a", ["a"]), "b": ("b", ["b"])}
+
+
+def test_build_signature_values(tmp_path: Path) -> None:
+
+    def signature(options=(), **kwargs) -> tuple:
+
+        ext = CMakeExtension(
+            name="ext",
+            source_dir=str(tmp_path),
+            cmake_configure_options=list(options),
+            **kwargs,
+        )
+
+        return BuildExtension.build_signature(ext=ext)
+
+    # The values of the toolchain, compilers, flags, and generator options matter
+    for option in (
+        "CMAKE_C_COMPILER",
+        "CMAKE_CXX_COMPILER_LAUNCHER",
+        "CMAKE_CXX_FLAGS_RELEASE",
+        "CMAKE_SHARED_LINKER_FLAGS",
+        "CMAKE_GENERATOR_PLATFORM",
+    ):
+        assert signature([f"-D{option}=a"]) != signature([f"-D{option}=b"])
+
+    # The type of the variable does not
+    assert signature(["-DCMAKE_C_COMPILER:FILEPATH=a"]) == signature(
+        ["-DCMAKE_C_COMPILER=a"]
+    )
+
+    # The values of the other variables matter, unless they are variant variables
+    assert signature(["-DFOO=a"]) != signature(["-DFOO=b"])
+
+    assert signature(["-DFOO=a"], cmake_variant_variables=["FOO"]) == signature(
+        ["-DFOO=b"], cmake_variant_variables=["FOO"]
+    )
+
+    # The toolchain, compilers, flags, and generator variables cannot be variant
+    assert signature(
+        ["-DCMAKE_C_COMPILER=a"], cmake_variant_variables=["CMAKE_*"]
+    ) != signature(["-DCMAKE_C_COMPILER=b"], cmake_variant_variables=["CMAKE_*"])
+
+    # Also the variant variables must be equal
+    assert signature(["-DFOO=a"], cmake_variant_variables=["FOO"]) != signature(
+        ["-DFOO=a"]
+    )
+
+    # The CMake dependencies do not, they are shared by the group
+    assert signature(cmake_depends_on=["a"]) == signature(cmake_depends_on=["b"])
+
+
+def test_example_extensions_share_build_folder(tmp_path: Path) -> None:
+
+    groups = group_build_folders(*example_extensions(source_dir=tmp_path))
+
+    assert groups == {
+        "SwigBindings": ("SwigBindings", ["SwigBindings", "Pybind11Bindings"]),
+        "Pybind11Bindings": ("SwigBindings", ["SwigBindings", "Pybind11Bindings"]),
+    }
+
+
+def test_shared_build_folder_depends_on(tmp_path: Path) -> None:
+
+    extensions = example_extensions(source_dir=tmp_path)
+
+    build_ext = BuildExtension(Distribution(dict(ext_modules=extensions)))
+    build_ext.ensure_finalized()
+    build_ext.shared_build_folders = build_ext.group_build_folders(extensions)
+
+    # The dependencies of all the extensions sharing the build folder are found
+    swig, pybind11 = [build_ext.cmake_builder(ext=ext) for ext in extensions]
+
+    assert swig.build_folder == pybind11.build_folder
+    assert swig.cmake_depends_on == ["pybind11"]
+    assert pybind11.cmake_depends_on == []
@@ -0,0 +1,142 @@
+import multiprocessing
+import time
+from pathlib import Path
+
+from cmake_build_extension.build_folders import (
+    BuildFolder,
+    BuildFolderIndex,
+    prune_object_files,
+    select_evictions,
+)
+
+DAY = 24 * 60 * 60
+
+
+def make_folder(
+    path: Path, extensions=("ext",), age: float = 0.0, size: int = 0
+) -> BuildFolder:
+
+    path.mkdir(parents=True, exist_ok=True)
+    (path / "data.bin").write_bytes(b"0" * size)
+
+    now = time.time()
+
+    return BuildFolder(
+        path=str(path),
+        extensions=list(extensions),
+        source_dir=str(path.parent),
+        cmake_build_type="Release",
+        created=now - age,
+        last_used=now - age,
+    )
+
+
+def test_select_evictions_age(tmp_path: Path) -> None:
+
+    old = make_folder(tmp_path / "old", age=10 * DAY)
+    new = make_folder(tmp_path / "new", age=1 * DAY)
+
+    assert select_evictions(folders=[old, new]) == []
+    assert select_evictions(folders=[old, new], max_age=5 * DAY) == [old]
+    assert select_evictions(folders=[old, new], max_age=0.5 * DAY) == [old, new]
+
+
+def test_select_evictions_size_budget(tmp_path: Path) -> None:
+
+    oldest = make_folder(tmp_path / "oldest", age=3 * DAY, size=1000)
+    old = make_folder(tmp_path / "old", age=2 * DAY, size=1000)
+    new = make_folder(tmp_path / "new", age=1 * DAY, size=1000)
+
+    folders = [new, oldest, old]
+
+    # The least recently used folders are evicted first
+    assert select_evictions(folders=folders, max_size=3000) == []
+    assert select_evictions(folders=folders, max_size=2999) == [oldest]
+    assert select_evictions(folders=folders, max_size=1500) == [oldest, old]
+    assert select_evictions(folders=folders, max_size=0) == [oldest, old, new]
+
+
+def test_select_evictions_size_budget_after_age(tmp_path: Path) -> None:
+
+    expired = make_folder(tmp_path / "expired", age=10 * DAY, size=1000)
+    old = make_folder(tmp_path / "old", age=2 * DAY, size=1000)
+    new = make_folder(tmp_path / "new", age=1 * DAY, size=1000)
+
+    # Expired folders do not count in the size budget
+    evicted = select_evictions(
+        folders=[expired, old, new], max_age=5 * DAY, max_size=2000
+    )
+
+    assert evicted == [expired]
+
+
+def test_select_evictions_orphans(tmp_path: Path) -> None:
+
+    kept = make_folder(tmp_path / "kept", extensions=["a"])
+    shared = make_folder(tmp_path / "shared", extensions=["a", "removed"])
+    orphan = make_folder(tmp_path / "orphan", extensions=["removed"])
+
+    folders = [kept, shared, orphan]
+
+    assert select_evictions(folders=folders) == []
+    assert select_evictions(folders=folders, known_extensions=["a"]) == [orphan]
+    assert select_evictions(folders=folders, known_extensions=[]) == folders
+
+
+def test_prune_object_files(tmp_path: Path) -> None:
+
+    (tmp_path / "CMakeFiles" / "ext.dir").mkdir(parents=True)
+    (tmp_path / "CMakeFiles" / "ext.dir" / "a.cpp.o").write_bytes(b"0" * 100)
+    (tmp_path / "CMakeFiles" / "ext.dir" / "b.cpp.obj").write_bytes(b"0" * 50)
+    (tmp_path / "libext.so").write_bytes(b"0" * 10)
+    (tmp_path / "CMakeCache.txt").write_text("CMAKE_BUILD_TYPE:STRING=Release\n")
+
+    assert prune_object_files(path=str(tmp_path)) == 150
+
+    remaining = sorted(p.name for p in tmp_path.rglob("*") if p.is_file())
+    assert remaining == ["CMakeCache.txt", "libext.so"]
+
+    assert prune_object_files(path=str(tmp_path)) == 0
+
+
+def test_index_register_evict(tmp_path: Path) -> None:
+
+    index = BuildFolderIndex.from_build_temp(build_temp=str(tmp_path / "temp"))
+
+    folder = tmp_path / "temp_ext"
+    folder.mkdir()
+
+    entry = index.register(
+        path=str(folder),
+        extensions=["ext"],
+        source_dir=str(tmp_path),
+        cmake_build_type="Release",
+    )
+
+    assert index.entries() == [entry]
+
+    index.evict(folder=entry)
+
+    assert not folder.exists()
+    assert index.entries() == []
+
+
+def register(index_file: str, path: str) -> None:
+
+    Path(path).mkdir()
+
+    BuildFolderIndex(index_file=Path(index_file)).register(
+        path=path, extensions=["ext"], source_dir=path, cmake_build_type="Release"
+    )
+
+
+def test_index_concurrent_register(tmp_path: Path) -> None:
+
+    index_file = tmp_path / "index.json"
+    paths = [str(tmp_path / f"temp_{i}") for i in range(16)]
+
+    with multiprocessing.get_context("spawn").Pool(processes=8) as pool:
+        pool.starmap(register, [(str(index_file), p) for p in paths])
+
+    index = BuildFolderIndex(index_file=index_file)
+    assert sorted(e.path for e in index.entries()) == sorted(paths)
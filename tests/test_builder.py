@@ -0,0 +1,197 @@
+import asyncio
+import os
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+import pytest
+
+import cmake_build_extension
+from cmake_build_extension import (
+    BuildEvent,
+    CMakeBuilder,
+    CMakeExtension,
+    DistributedCompile,
+)
+
+
+def make_builder(tmp_path: Path, events: List[BuildEvent], **kwargs) -> CMakeBuilder:
+
+    ext = CMakeExtension(name="ext", source_dir=str(tmp_path), **kwargs)
+
+    return CMakeBuilder(
+        ext=ext,
+        build_folder=str(tmp_path / "build"),
+        ext_dir=str(tmp_path / "dist"),
+        on_event=events.append,
+    )
+
+
+def test_run_command_long_lines(tmp_path: Path) -> None:
+
+    events = []
+    builder = make_builder(tmp_path=tmp_path, events=events)
+
+    # Lines longer than the 64 KiB limit of the asyncio stream readers
+    code = "print('a' * 200000); print('b'); print('c' * 100000, end='')"
+
+    asyncio.run(
+        builder._run_command(
+            phase="build", command=[sys.executable, "-c", code], env=builder.env
+        )
+    )
+
+    output = [e.message for e in events if e.kind == "output"]
+
+    assert output == ["a" * 200000, "b", "c" * 100000]
+    assert events[-1].kind == "finished"
+
+
+def test_run_command_terminates_on_error(tmp_path: Path) -> None:
+
+    def on_event(event: BuildEvent) -> None:
+
+        if event.kind == "output":
+            raise RuntimeError(event.message)
+
+    builder = make_builder(tmp_path=tmp_path, events=[])
+    builder.on_event = on_event
+
+    # The process writes a marker file only if it is not terminated
+    marker = tmp_path / "marker"
+    code = (
+        "import time; print('started', flush=True); time.sleep(1); "
+        f"open({str(marker)!r}, 'w')"
+    )
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(
+            builder._run_command(
+                phase="build", command=[sys.executable, "-c", code], env=builder.env
+            )
+        )
+
+    # The failing event handler does not leave the process running
+    time.sleep(2)
+    assert not marker.exists()
+
+
+def test_no_reachable_workers_event(tmp_path: Path) -> None:
+
+    events = []
+
+    builder = make_builder(
+        tmp_path=tmp_path,
+        events=events,
+        distributed_compile=DistributedCompile(launcher="distcc", hosts=[]),
+    )
+
+    asyncio.run(builder._resolve_hosts(phase="configure"))
+
+    assert builder.hosts == []
+    assert events == [
+        BuildEvent(
+            extension="ext",
+            phase="configure",
+            kind="output",
+            message="No remote worker reachable, falling back to local compilation",
+        )
+    ]
+
+
+def test_components(tmp_path: Path) -> None:
+
+    builder = make_builder(tmp_path=tmp_path, events=[])
+    assert builder.components() == [None]
+
+    builder.ext.cmake_component = ["python", "bin", "python", "", "lib", "bin"]
+    assert builder.components() == ["python", "bin", "lib"]
+
+    # The component passed to the builder has higher priority
+    builder.cmake_component = "lib;;python;lib"
+    assert builder.components() == ["lib", "python"]
+
+    commands = builder.install_commands()
+    assert [c[c.index("--component") + 1] for c in commands] == ["lib", "python"]
+
+
+@pytest.mark.skipif(shutil.which("cmake") is None, reason="CMake is not available")
+def test_normalize_paths_user_project_include(tmp_path: Path) -> None:
+
+    (tmp_path / "CMakeLists.txt").write_text(
+        "cmake_minimum_required(VERSION 3.16)\nproject(Project LANGUAGES NONE)\n"
+    )
+    (tmp_path / "user.cmake").write_text('message(STATUS "User project include")\n')
+
+    events = []
+
+    builder = make_builder(
+        tmp_path=tmp_path,
+        events=events,
+        normalize_paths=True,
+        cmake_configure_options=[f"-DCMAKE_PROJECT_INCLUDE={tmp_path / 'user.cmake'}"],
+    )
+
+    assert builder.user_project_include() == str(tmp_path / "user.cmake")
+
+    # The generated script is passed last and includes the script of the user
+    command = builder.configure_command()
+    assert command[-1].startswith("-DCMAKE_PROJECT_INCLUDE:FILEPATH=")
+
+    asyncio.run(builder.configure())
+
+    output = [e.message for e in events if e.kind == "output"]
+    assert "-- User project include" in output
+
+    builder.cmake_defines = ["-D", "CMAKE_PROJECT_INCLUDE:FILEPATH=other.cmake"]
+    assert builder.user_project_include() == "other.cmake"
+
+
+def test_install_cancels_other_components(tmp_path: Path) -> None:
+
+    events = []
+    builder = make_builder(tmp_path=tmp_path, events=events)
+
+    # The second installation writes a marker file only if it is not terminated
+    marker = tmp_path / "marker"
+    slow = f"import time; time.sleep(1); open({str(marker)!r}, 'w')"
+
+    builder.install_commands = lambda: [
+        [sys.executable, "-c", "raise SystemExit(1)"],
+        [sys.executable, "-c", slow],
+    ]
+
+    async def install() -> None:
+
+        with pytest.raises(subprocess.CalledProcessError):
+            await builder.install()
+
+        # The loop keeps running, without orphaned installations
+        await asyncio.sleep(2)
+
+    asyncio.run(install())
+
+    assert not marker.exists()
+    assert [e.kind for e in events if e.kind in {"failed", "cancelled"}] == [
+        "failed",
+        "cancelled",
+    ]
+
+
+def test_cmake_env_depends_on(tmp_path: Path) -> None:
+
+    builder = make_builder(tmp_path=tmp_path, events=[], cmake_depends_on=["pytest"])
+    builder.cmake_depends_on = ["cmake_build_extension", "pytest"]
+    builder.env["CMAKE_PREFIX_PATH"] = "user"
+
+    # The packages of the extension and of the builder are listed only once
+    paths = builder._cmake_env()["CMAKE_PREFIX_PATH"].split(os.pathsep)
+
+    assert paths == [
+        str(Path(cmake_build_extension.__file__).parent),
+        str(Path(pytest.__file__).parent),
+        "user",
+    ]
@@ -0,0 +1,234 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from cmake_build_extension import DistributedCompile
+
+# Stand-in remote worker: a process accepting connections on a localhost port
+LISTENER = """
+import socket
+
+server = socket.create_server(("127.0.0.1", 0))
+print(server.getsockname()[1], flush=True)
+
+while True:
+    server.accept()[0].close()
+"""
+
+# Stand-in remote exec command: records the worker and runs the command locally.
+# If DROP_PID is set, the worker is stopped and the remote command fails to connect.
+WORKER = """
+import os
+import socket
+import subprocess
+import sys
+import time
+
+with open(os.environ["WORKER_LOG"], "a") as f:
+    f.write(sys.argv[1] + "\\n")
+
+if "DROP_PID" in os.environ:
+    os.kill(int(os.environ["DROP_PID"]), 15)
+    name, port = sys.argv[1].split(":")
+    while True:
+        try:
+            socket.create_connection((name, int(port)), timeout=1.0).close()
+            time.sleep(0.05)
+        except OSError:
+            sys.exit(255)
+
+sys.exit(subprocess.call(sys.argv[2:]))
+"""
+
+
+def start_listener() -> subprocess.Popen:
+
+    return subprocess.Popen(
+        [sys.executable, "-c", LISTENER], stdout=subprocess.PIPE, text=True
+    )
+
+
+@pytest.fixture
+def listeners():
+
+    processes = [start_listener() for _ in range(3)]
+    ports = [int(p.stdout.readline()) for p in processes]
+
+    yield processes, [f"127.0.0.1:{port}" for port in ports]
+
+    stop(processes)
+
+
+def stop(processes: List[subprocess.Popen]) -> None:
+
+    for process in processes:
+        process.kill()
+        process.wait()
+
+
+def run_launcher(
+    dc: DistributedCompile, hosts: List[str], cwd: Path, env: dict, command: List[str]
+) -> subprocess.CompletedProcess:
+
+    # Run the launcher as stored in the CMake cache, with a clean environment
+    dc.write_launcher(build_folder=str(cwd))
+    option = dc.cmake_options(hosts=hosts, build_folder=str(cwd))[0]
+    launcher = option.partition("=")[2].split(";")
+
+    if "SYSTEMROOT" in os.environ:
+        env = dict(env, SYSTEMROOT=os.environ["SYSTEMROOT"])
+
+    return subprocess.run(
+        launcher + command, cwd=cwd, env=env, stderr=subprocess.PIPE, text=True
+    )
+
+
+def test_reachable_hosts(listeners) -> None:
+
+    processes, hosts = listeners
+
+    # A port that is not listening
+    closed = start_listener()
+    closed_host = f"127.0.0.1:{int(closed.stdout.readline())}"
+    stop([closed])
+
+    dc = DistributedCompile(
+        launcher="distcc", hosts=[hosts[0], closed_host, *hosts[1:]]
+    )
+    assert dc.reachable_hosts() == hosts
+
+    stop(processes[:2])
+    assert dc.reachable_hosts() == hosts[2:]
+
+
+def test_parallel_level(listeners) -> None:
+
+    _, hosts = listeners
+
+    dc = DistributedCompile(
+        launcher="distcc", hosts=[f"{hosts[0]}/4", *hosts[1:]], jobs_per_host=2
+    )
+
+    assert dc.parse_host(host=f"{hosts[0]}/4")[2] == 4
+    assert dc.parallel_level(hosts=dc.reachable_hosts()) == 4 + 2 + 2
+
+
+def test_fallback_without_hosts(listeners) -> None:
+
+    processes, hosts = listeners
+
+    dc = DistributedCompile(
+        launcher="distcc", hosts=[f"{h}/8" for h in hosts], hosts_env="DISTCC_HOSTS"
+    )
+
+    stop(processes)
+    reachable = dc.reachable_hosts()
+
+    assert reachable == []
+    assert dc.parallel_level(hosts=reachable) == (os.cpu_count() or 1)
+    assert dc.environment(hosts=reachable) == {"DISTCC_HOSTS": ""}
+
+    # The launcher possibly stored in the CMake cache is reset
+    assert dc.cmake_options(hosts=reachable, build_folder="build") == [
+        "-DCMAKE_C_COMPILER_LAUNCHER=",
+        "-DCMAKE_CXX_COMPILER_LAUNCHER=",
+    ]
+
+
+def test_remote_exec_template(listeners, tmp_path: Path) -> None:
+
+    _, hosts = listeners
+
+    worker = tmp_path / "worker.py"
+    worker.write_text(WORKER)
+
+    dc = DistributedCompile(
+        launcher=f"'{sys.executable}' '{worker}' {{host}}",
+        hosts=[f"{h}/2" for h in hosts],
+    )
+
+    reachable = dc.reachable_hosts()
+    log = tmp_path / "worker.log"
+    compile_command = [sys.executable, "-c", "open('out.o', 'w').write('compiled')"]
+
+    result = run_launcher(
+        dc=dc,
+        hosts=reachable,
+        cwd=tmp_path,
+        env=dict(WORKER_LOG=str(log)),
+        command=compile_command,
+    )
+
+    # The command is dispatched to a worker through the template, and the launcher
+    # runs without the package and its warnings
+    assert result.returncode == 0
+    assert result.stderr == ""
+    assert log.read_text().split() in [[h] for h in hosts]
+    assert (tmp_path / "out.o").read_text() == "compiled"
+
+    # Failures of the compilation are not retried
+    result = run_launcher(
+        dc=dc,
+        hosts=reachable,
+        cwd=tmp_path,
+        env=dict(WORKER_LOG=str(log)),
+        command=[sys.executable, "-c", "raise SystemExit(3)"],
+    )
+
+    assert result.returncode == 3
+    assert len(log.read_text().split()) == 2
+
+
+def test_remote_exec_worker_dropout(listeners, tmp_path: Path) -> None:
+
+    processes, hosts = listeners
+
+    worker = tmp_path / "worker.py"
+    worker.write_text(WORKER)
+
+    dc = DistributedCompile(
+        launcher=f"'{sys.executable}' '{worker}' {{host}}", hosts=hosts[:1]
+    )
+
+    reachable = dc.reachable_hosts()
+    log = tmp_path / "worker.log"
+
+    # The worker drops out while compiling, and the command is compiled locally
+    result = run_launcher(
+        dc=dc,
+        hosts=reachable,
+        cwd=tmp_path,
+        env=dict(WORKER_LOG=str(log), DROP_PID=str(processes[0].pid)),
+        command=[sys.executable, "-c", "open('out.o', 'w').write('compiled')"],
+    )
+
+    assert result.returncode == 0
+    assert "dropped out" in result.stderr
+    assert log.read_text().split() == hosts[:1]
+    assert (tmp_path / "out.o").read_text() == "compiled"
+
+
+def test_remote_exec_without_configuration(tmp_path: Path) -> None:
+
+    dc = DistributedCompile(launcher="unused {host}", hosts=[])
+    script = dc.write_launcher(build_folder=str(tmp_path))
+
+    # A launcher without configuration compiles locally
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-S",
+            str(script),
+            sys.executable,
+            "-c",
+            "raise SystemExit(4)",
+        ],
+        cwd=tmp_path,
+        env={},
+    )
+
+    assert result.returncode == 4
@@ -0,0 +1,147 @@
+import asyncio
+import shutil
+import tarfile
+from pathlib import Path
+
+import pytest
+
+from cmake_build_extension import CMakeBuilder, CMakeExtension, FetchContentCache
+
+pytestmark = pytest.mark.skipif(
+    shutil.which("cmake") is None, reason="CMake is not available"
+)
+
+PROJECT = """
+cmake_minimum_required(VERSION 3.16)
+project(Project LANGUAGES NONE)
+include(FetchContent)
+FetchContent_Declare(MyDep URL "{url}")
+FetchContent_MakeAvailable(MyDep)
+file(READ "${{mydep_SOURCE_DIR}}/version.txt" version)
+message(STATUS "MyDep version: ${{version}}")
+"""
+
+
+def make_archive(path: Path, version: str) -> str:
+
+    src = path.parent / f"{path.stem}_src"
+    src.mkdir()
+    (src / "CMakeLists.txt").write_text("cmake_minimum_required(VERSION 3.16)\n")
+    (src / "version.txt").write_text(version)
+
+    with tarfile.open(path, "w:gz") as tar:
+        tar.add(src, arcname="mydep")
+
+    return path.as_uri()
+
+
+def configure(
+    source_dir: Path,
+    build_folder: Path,
+    cache: FetchContentCache,
+    cmake_defines=(),
+    cmake_version=None,
+):
+
+    events = []
+
+    builder = CMakeBuilder(
+        ext=CMakeExtension(name="ext", source_dir=str(source_dir)),
+        build_folder=str(build_folder),
+        ext_dir=str(build_folder / "dist"),
+        cmake_defines=list(cmake_defines),
+        fetchcontent_cache=cache,
+        on_event=events.append,
+    )
+
+    if cmake_version is not None:
+
+        async def _cmake_version():
+            return cmake_version
+
+        builder._cmake_version = _cmake_version
+
+    asyncio.run(builder.configure())
+
+    return [e.message for e in events if e.kind == "output"]
+
+
+def test_fetchcontent_cache(tmp_path: Path) -> None:
+
+    source_dir = tmp_path / "project"
+    source_dir.mkdir()
+
+    cache = FetchContentCache(cache_dir=str(tmp_path / "cache"))
+    url = make_archive(path=tmp_path / "dep_v1.tgz", version="1")
+
+    (source_dir / "CMakeLists.txt").write_text(PROJECT.format(url=url))
+
+    # The populated sources are stored in the cache
+    output = configure(source_dir, tmp_path / "build1", cache)
+
+    assert "-- MyDep version: 1" in output
+    assert not any("Manually-specified variables" in line for line in output)
+    assert len(cache.cached_sources()) == 1
+    assert cache.cached_sources()[0].name.startswith("mydep-")
+
+    # A new build folder uses the cached sources, also if the archive is gone
+    (tmp_path / "dep_v1.tgz").unlink()
+    output = configure(source_dir, tmp_path / "build2", cache)
+
+    assert "-- MyDep version: 1" in output
+    assert len(cache.cached_sources()) == 1
+
+    cmake_cache = (tmp_path / "build2" / "CMakeCache.txt").read_text()
+    assert "FETCHCONTENT_SOURCE_DIR_MYDEP:PATH=\n" in cmake_cache
+
+    # Changing the declaration does not reuse the stale sources
+    url = make_archive(path=tmp_path / "dep_v2.tgz", version="2")
+    (source_dir / "CMakeLists.txt").write_text(PROJECT.format(url=url))
+
+    output = configure(source_dir, tmp_path / "build2", cache)
+
+    assert "-- MyDep version: 2" in output
+    assert len(cache.cached_sources()) == 2
+
+
+def test_fetchcontent_cache_user_top_level_includes(tmp_path: Path) -> None:
+
+    source_dir = tmp_path / "project"
+    source_dir.mkdir()
+
+    url = make_archive(path=tmp_path / "dep.tgz", version="1")
+    (source_dir / "CMakeLists.txt").write_text(PROJECT.format(url=url))
+
+    user_include = tmp_path / "user.cmake"
+    user_include.write_text('message(STATUS "User top level include")\n')
+
+    cache = FetchContentCache(cache_dir=str(tmp_path / "cache"))
+
+    # The includes passed by the user are kept
+    output = configure(
+        source_dir,
+        tmp_path / "build",
+        cache,
+        cmake_defines=[f"-DCMAKE_PROJECT_TOP_LEVEL_INCLUDES={user_include}"],
+    )
+
+    assert "-- User top level include" in output
+    assert len(cache.cached_sources()) == 1
+
+
+def test_fetchcontent_cache_old_cmake(tmp_path: Path) -> None:
+
+    source_dir = tmp_path / "project"
+    source_dir.mkdir()
+
+    url = make_archive(path=tmp_path / "dep.tgz", version="1")
+    (source_dir / "CMakeLists.txt").write_text(PROJECT.format(url=url))
+
+    cache = FetchContentCache(cache_dir=str(tmp_path / "cache"))
+
+    # The cache is disabled with CMake < 3.24, without unused variables
+    output = configure(source_dir, tmp_path / "build", cache, cmake_version=(3, 22))
+
+    assert "The FetchContent cache requires CMake >= 3.24, disabling it" in output
+    assert not any("Manually-specified variables" in line for line in output)
+    assert cache.cached_sources() == []
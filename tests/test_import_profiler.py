@@ -0,0 +1,139 @@
+import pytest
+
+from cmake_build_extension import ImportBudget, ImportProfile, import_profiler
+
+# Output of: LD_DEBUG=statistics,files python -s -X importtime -c "import json"
+# The lines of pid 13675 belong to another process writing on the same stderr.
+IMPORT_STDERR = """\
+     13672:	file=libc.so.6 [0];  needed by /usr/bin/python3.11 [0]
+     13672:	file=libc.so.6 [0];  generating link map
+     13672:	file=libm.so.6 [0];  needed by /usr/bin/python3.11 [0]
+     13672:	file=libm.so.6 [0];  generating link map
+     13672:	runtime linker statistics:
+     13672:	  total startup time in dynamic loader: 130446 cycles
+     13672:	            time needed for relocation: 53738 cycles (41.1%)
+     13672:	                 number of relocations: 505
+     13672:	      number of relocations from cache: 7
+     13672:	        number of relative relocations: 3882
+import time: self [us] | cumulative | imported package
+import time:       112 |        112 |   _io
+import time:       263 |        263 |       _json
+     13672:	file=/usr/lib/python3.11/lib-dynload/_json.cpython-311-x86_64-linux-gnu.so [0];  dynamically loaded by /usr/bin/python3.11 [0]
+     13672:	file=/usr/lib/python3.11/lib-dynload/_json.cpython-311-x86_64-linux-gnu.so [0];  generating link map
+import time:       499 |        762 |     json.scanner
+import time:       454 |       9341 |   json.decoder
+import time:       516 |        516 |   json.encoder
+import time:       298 |      {json} | json
+     13672:	calling fini: /lib/x86_64-linux-gnu/libc.so.6 [0]
+     13672:	runtime linker statistics:
+     13672:	           final number of relocations: 1134
+     13672:	final number of relocations from cache: 12995
+     13675:	file=libc.so.6 [0];  generating link map
+     13675:	runtime linker statistics:
+     13675:	           final number of relocations: 90
+"""
+
+# Output of: LD_DEBUG=statistics,files python -s -X importtime -c "pass"
+BASELINE_STDERR = """\
+     13680:	file=libc.so.6 [0];  needed by /usr/bin/python3.11 [0]
+     13680:	file=libc.so.6 [0];  generating link map
+     13680:	file=libm.so.6 [0];  needed by /usr/bin/python3.11 [0]
+     13680:	file=libm.so.6 [0];  generating link map
+     13680:	runtime linker statistics:
+     13680:	  total startup time in dynamic loader: 128011 cycles
+     13680:	            time needed for relocation: 52102 cycles (40.7%)
+     13680:	runtime linker statistics:
+     13680:	           final number of relocations: 1010
+"""
+
+
+def test_parse_loader_statistics() -> None:
+
+    statistics = import_profiler.parse_loader_statistics(
+        pid=13672, stderr=IMPORT_STDERR.format(json=10154)
+    )
+
+    assert statistics == dict(
+        loaded_objects=3,
+        relocations=1134,
+        startup_cycles=130446,
+        relocation_cycles=53738,
+    )
+
+    # Lines of other processes are ignored
+    statistics = import_profiler.parse_loader_statistics(
+        pid=13675, stderr=IMPORT_STDERR.format(json=10154)
+    )
+
+    assert statistics == dict(loaded_objects=1, relocations=90)
+
+
+def test_profile_import(monkeypatch) -> None:
+
+    # The cumulative import times of the runs, the fastest one is reported
+    import_times = iter([12000, 10154, 11000])
+
+    def run_python(code: str, path: str, env: dict):
+
+        if code == "pass":
+            return 13680, BASELINE_STDERR
+
+        assert code == "import json"
+        return 13672, IMPORT_STDERR.format(json=next(import_times))
+
+    monkeypatch.setattr(import_profiler, "run_python", run_python)
+    monkeypatch.setattr(import_profiler.platform, "system", lambda: "Linux")
+
+    profile = import_profiler.profile_import(
+        package="json", path="site-packages", env={}, runs=3, top=3
+    )
+
+    assert profile == ImportProfile(
+        package="json",
+        import_time=10.154,
+        modules={"json": 10.154, "json.decoder": 9.341, "json.scanner": 0.762},
+        loaded_objects=3 - 2,
+        relocations=1134 - 1010,
+        loader_startup_cycles=dict(total=130446, relocation=53738),
+    )
+
+
+def test_profile_import_not_imported(monkeypatch) -> None:
+
+    monkeypatch.setattr(
+        import_profiler, "run_python", lambda code, path, env: (1, "import time: x")
+    )
+
+    with pytest.raises(RuntimeError):
+        import_profiler.profile_import(package="json", path="", env={}, runs=1)
+
+
+def test_check_budget() -> None:
+
+    profile = ImportProfile(
+        package="json",
+        import_time=10.154,
+        modules={"json": 10.154},
+        loaded_objects=1,
+        relocations=124,
+    )
+
+    assert import_profiler.check_budget(profile=profile, budget=ImportBudget()) == []
+
+    within = ImportBudget(import_time=20.0, loaded_objects=1, relocations=200)
+    assert import_profiler.check_budget(profile=profile, budget=within) == []
+
+    budget = ImportBudget(import_time=5.0, loaded_objects=0, relocations=100)
+
+    assert import_profiler.check_budget(profile=profile, budget=budget) == [
+        "import_time: 10.154 ms > 5.0 ms",
+        "loaded_objects: 1 > 0",
+        "relocations: 124 > 100",
+    ]
+
+    # The metrics not available on the platform are not checked
+    profile = profile._replace(loaded_objects=None, relocations=None)
+
+    assert import_profiler.check_budget(profile=profile, budget=budget) == [
+        "import_time: 10.154 ms > 5.0 ms"
+    ]